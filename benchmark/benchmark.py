@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+export benchmark
+
+generate synthetic meshes with the unity/unreal attribute layouts,
+feed them through a stand-in of the Mesh Viewer table model and `export_fbx`,
+record the time and the peak memory of every phase as json.
+
+    python benchmark/benchmark.py --sizes 1000,10000 --output result.json
+    python benchmark/benchmark.py --compare old.json new.json
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import sys
+import json
+import time
+import array
+import random
+import tempfile
+import argparse
+import platform
+import tracemalloc
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(DIR), "timmyliang"))
+
+from exporter.fbx import core, numpy_engine, pipeline
+
+SIZES = (1000, 10000, 100000, 1000000, 5000000)
+COMPONENTS = "xyzw"
+
+# NOTE component count of every vertex input, unreal pack the extra inputs too
+LAYOUTS = {
+    "unity": {
+        "POSITION": 3,
+        "NORMAL": 3,
+        "TANGENT": 4,
+        "COLOR": 4,
+        "TEXCOORD0": 2,
+        "TEXCOORD1": 2,
+    },
+    "unreal": dict(
+        {"ATTRIBUTE%s" % i: 4 for i in range(14)},
+        ATTRIBUTE0=3,
+        ATTRIBUTE5=2,
+        ATTRIBUTE6=2,
+    ),
+}
+
+
+class TableModel(object):
+    """stand-in of the `vsinData` table model, one row per index like the Mesh Viewer"""
+
+    def __init__(self, layout, vertex_count, seed=0):
+        rand = random.Random(seed)
+        # NOTE grid topology, about two triangles per vertex
+        width = max(int(vertex_count ** 0.5), 2)
+        height = max(vertex_count // width, 2)
+        self.indices = array.array("i")
+        for y in range(height - 1):
+            for x in range(width - 1):
+                i = y * width + x
+                self.indices.extend((i, i + 1, i + width, i + 1, i + width + 1, i + width))
+
+        count = width * height
+        self.headers = ["VTX", "IDX"]
+        self.columns = []
+        for attr, size in sorted(layout.items()):
+            values = array.array("d", [rand.uniform(-1, 1) for _ in range(count * size)])
+            for c in range(size):
+                self.headers.append("%s.%s" % (attr, COMPONENTS[c]))
+                self.columns.append((values, size, c))
+
+    @property
+    def vertex_count(self):
+        return max(self.indices) + 1
+
+    def rowCount(self):
+        return len(self.indices)
+
+    def columnCount(self):
+        return len(self.headers)
+
+    def headerData(self, column, orientation):
+        return self.headers[column]
+
+    def index(self, row, column):
+        return row, column
+
+    def data(self, index):
+        row, column = index
+        if column == 0:
+            return row
+        if column == 1:
+            return self.indices[row]
+        # NOTE the Qt model return display strings
+        values, size, c = self.columns[column - 2]
+        return str(values[self.indices[row] * size + c])
+
+
+def measure(name, func, memory, records, **info):
+    if memory:
+        tracemalloc.start()
+    current = time.time()
+    result = func()
+    elapsed = time.time() - current
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    record = dict(info, phase=name, seconds=round(elapsed, 4), peak_bytes=peak)
+    records.append(record)
+    print("%(layout)-7s %(vertices)9s %(format)-6s %(phase)-10s %(seconds)10.3fs" % record)
+    return result
+
+
+def run(layout, size, formats, memory, records):
+    model = TableModel(LAYOUTS[layout], size)
+    info = {"layout": layout, "vertices": model.vertex_count, "indices": model.rowCount(), "format": ""}
+
+    # NOTE only the mapped inputs are collected like the extension
+    mapper = dict(core.TEMPLATES[layout], ENGINE=layout)
+    collect = lambda: core.collect_model_data(model, None, attrs=core.mapped_attributes(mapper))
+    data, attr_list = measure("collect", collect, memory, records, **info)
+    rearrange = lambda: core.rearrange_model_data(data, attr_list, model.rowCount())
+    data = measure("rearrange", rearrange, memory, records, **info)
+
+    geometry = measure("geometry", lambda: core.mesh_geometry(mapper, data, attr_list), memory, records, **info)
+    # NOTE the three phases above overlapped, the layers are built while the next attribute is collected
+    pipelined = lambda: pipeline.collect_encode(model, None, mapper)
+    measure("pipeline", pipelined, memory, records, **info)
+
+    for fmt in formats:
+        mapper["FORMAT"] = fmt
+        save_path = os.path.join(tempfile.gettempdir(), "renderdoc2fbx_benchmark.fbx")
+        info["format"] = fmt
+        write = lambda: core.write_scene(save_path, mapper, [("benchmark", geometry)], 1)
+        measure("serialize", write, memory, records, **info)
+        records[-1]["file_bytes"] = os.path.getsize(save_path)
+        os.remove(save_path)
+
+
+def compare(old_path, new_path):
+    """print the time ratio of every phase between two results"""
+    key = lambda r: (r["layout"], r["vertices"], r["format"], r["phase"])
+    with open(old_path) as f:
+        old = {key(r): r for r in json.load(f)["records"]}
+    with open(new_path) as f:
+        new = json.load(f)["records"]
+
+    for record in new:
+        base = old.get(key(record))
+        if not base or not base["seconds"]:
+            continue
+        ratio = record["seconds"] / base["seconds"]
+        print("%-7s %9s %-6s %-10s %8.3fs -> %8.3fs  x%.2f" % (key(record) + (base["seconds"], record["seconds"], ratio)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="renderdoc2fbx export benchmark")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="comma separated vertex counts")
+    parser.add_argument("--layouts", default="unity,unreal", help="comma separated attribute layouts")
+    parser.add_argument("--formats", default="ascii,binary", help="comma separated output formats")
+    parser.add_argument("--memory", action="store_true", help="trace the peak memory, slow down every phase")
+    parser.add_argument("--output", default="benchmark.json", help="result json path")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result json")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    records = []
+    for layout in args.layouts.split(","):
+        for size in [int(size) for size in args.sizes.split(",")]:
+            run(layout, size, args.formats.split(","), args.memory, records)
+
+    result = {
+        "python": sys.version,
+        "platform": platform.platform(),
+        "numpy": numpy_engine.np is not None,
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "records": records,
+    }
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=4)
+    print("result saved to %s" % args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,423 +13,266 @@ __date__ = "2021-01-26 20:44:17"
 
 
 import os
+import sys
 import time
-import json
-import struct
-import inspect
-from textwrap import dedent
+import traceback
 from functools import partial
-from collections import defaultdict
-
-from PySide2 import QtWidgets, QtCore
-
-import qrenderdoc
-
-from .query_dialog import QueryDialog
-from .progress_dialog import MProgressDialog
-
-FBX_ASCII_TEMPLETE = """
-    ; FBX 7.3.0 project file
-    ; ----------------------------------------------------
-
-    ; Object definitions
-    ;------------------------------------------------------------------
-
-    Definitions:  {
-
-        ObjectType: "Geometry" {
-            Count: 1
-            PropertyTemplate: "FbxMesh" {
-                Properties70:  {
-                    P: "Primary Visibility", "bool", "", "",1
-                }
-            }
-        }
-
-        ObjectType: "Model" {
-            Count: 1
-            PropertyTemplate: "FbxNode" {
-                Properties70:  {
-                    P: "Visibility", "Visibility", "", "A",1
-                }
-            }
-        }
-    }
-
-    ; Object properties
-    ;------------------------------------------------------------------
-
-    Objects:  {
-        Geometry: 2035541511296, "Geometry::", "Mesh" {
-            Vertices: *%(vertices_num)s {
-                a: %(vertices)s
-            } 
-            PolygonVertexIndex: *%(polygons_num)s {
-                a: %(polygons)s
-            } 
-            GeometryVersion: 124
-            %(LayerElementNormal)s
-            %(LayerElementBiNormal)s
-            %(LayerElementTangent)s
-            %(LayerElementColor)s
-            %(LayerElementUV)s
-            %(LayerElementUV2)s
-            Layer: 0 {
-                Version: 100
-                %(LayerElementNormalInsert)s
-                %(LayerElementBiNormalInsert)s
-                %(LayerElementTangentInsert)s
-                %(LayerElementColorInsert)s
-                %(LayerElementUVInsert)s
-                
-            }
-            Layer: 1 {
-                Version: 100
-                %(LayerElementUV2Insert)s
-            }
-        }
-        Model: 2035615390896, "Model::%(model_name)s", "Mesh" {
-            Properties70:  {
-                P: "DefaultAttributeIndex", "int", "Integer", "",0
-            }
-        }
-    }
-
-    ; Object connections
-    ;------------------------------------------------------------------
-
-    Connections:  {
-        
-        ;Model::pCube1, Model::RootNode
-        C: "OO",2035615390896,0
-        
-        ;Geometry::, Model::pCube1
-        C: "OO",2035541511296,2035615390896
-
-    }
 
+from .core import scene_meshes, write_scene, export_fbx, export_glb
+from .core import collect_model_data, rearrange_model_data, mapped_attributes, export_animation
+from . import spill
+from . import batch
+from . import pipeline
+from . import helper
+from . import profiler
+from . import generate
+from .mesh_cache import MeshCache, cache_key, DEFAULT_DIRECTORY
+from .topology import UnsupportedMesh, triangulate
+
+try:
+    from PySide2 import QtWidgets, QtCore
+
+    import qrenderdoc
+
+    from .query_dialog import QueryDialog
+    from .progress_dialog import MProgressDialog
+    from .background import BackgroundExport
+    from .replay_data import UnsupportedFormat, fetch_mesh_data, primitive_topology
+except ImportError:
+    # NOTE headless import from the command line or the parallel encoding workers
+    qrenderdoc = None
+
+# NOTE keep the decoded mesh across exports
+MESH_CACHE = MeshCache()
+
+
+def configure_cache(mapper):
+    directory = DEFAULT_DIRECTORY if mapper.get("CACHE_DISK") else None
+    budget = mapper.get("CACHE_BUDGET")
+    MESH_CACHE.configure(budget * 1024 * 1024 if budget is not None else None, directory)
+
+
+def capture_identity(pyrenderdoc):
+    """capture path with its size and mtime, a re-saved capture never hit the old entries"""
+    path = pyrenderdoc.GetCaptureFilename()
+    if not os.path.isfile(path):
+        return [path]
+    stat = os.stat(path)
+    return [path, stat.st_size, stat.st_mtime]
+
+
+def fetch_action(controller, action, capture):
+    """vertex inputs of the action through the mesh cache, `capture` None skip the cache"""
+    key = cache_key(capture, action.eventId, "replay")
+    cached = MESH_CACHE.get(key) if capture else None
+    if cached:
+        return cached
+    controller.SetFrameEvent(action.eventId, True)
+    data, attr_list = fetch_mesh_data(controller, action)
+    if capture and data:
+        MESH_CACHE.put(key, data, attr_list)
+    return data, attr_list
+
+
+def fetch_actions(controller, actions, capture, progress=None):
+    """yield (event_id, data, attr_list), the next action is decoded only after the previous one is consumed"""
+    for action in actions:
+        if progress:
+            progress("fetch event %s" % action.eventId)
+        with profiler.stage("fetch %s" % action.eventId):
+            data, attr_list = fetch_action(controller, action, capture)
+        yield action.eventId, data, attr_list
+
+
+def export_fbx_scene(save_path, mapper, actions, restore_event, capture, controller, progress=None):
+    """export the draw of every action into one FBX scene, must run on the replay thread
+
+    `capture` identify the capture for the mesh cache, None skip the cache.
     """
+    save_name = os.path.basename(os.path.splitext(save_path)[0])
 
+    def items():
+        for event_id, data, attr_list in fetch_actions(controller, actions, capture, progress):
+            yield "%s_%s" % (save_name, event_id), data, attr_list
 
-def export_fbx(save_path, mapper, data, attr_list, controller):
+    try:
+        # NOTE identical draws (e.g. instanced props) share one Geometry
+        meshes = scene_meshes(items(), mapper, progress)
+        write_scene(save_path, mapper, meshes, len(actions), progress)
+    finally:
+        controller.SetFrameEvent(restore_event, True)
 
-    if not data:
-        # manager.ErrorDialog("Current Draw Call lack of Vertex. ", "Error")
-        return
 
-    save_name = os.path.basename(os.path.splitext(save_path)[0])
+def export_vertex_animation(save_path, mapper, actions, restore_event, capture, controller, progress=None):
+    """export the first action as the FBX topology and every action as a frame of the point cache
+
+    must run on the replay thread, the actions have to share one index buffer.
+    """
+    try:
+        frames = fetch_actions(controller, actions, capture, progress)
+        export_animation(save_path, mapper, frames, progress)
+    finally:
+        controller.SetFrameEvent(restore_event, True)
+
+
+def batch_export(directory, mapper, restore_event, capture, controller, progress=None):
+    """export every draw of the capture into its own file, must run on the replay thread
+
+    the draws recorded in the manifest of `directory` by a previous run are skipped.
+    """
+    manifest_path = os.path.join(directory, batch.MANIFEST_NAME)
+    manifest = batch.load_manifest(manifest_path, capture)
+
+    def jobs():
+        for action in batch.iter_draws(controller.GetRootActions()):
+            if str(action.eventId) in manifest["entries"]:
+                continue
+            if progress:
+                progress("fetch event %s" % action.eventId)
+            current = time.time()
+            try:
+                controller.SetFrameEvent(action.eventId, True)
+                data, attr_list = fetch_mesh_data(controller, action)
+            except UnsupportedMesh:
+                # NOTE unsupported vertex format or point and line draws, keep the batch going
+                traceback.print_exc()
+                continue
+            if not data:
+                continue
+            save_path = batch.draw_path(directory, action.eventId, mapper)
+            yield action.eventId, save_path, data, attr_list, time.time() - current
+
+    try:
+        return batch.run_batch(manifest_path, manifest, jobs(), mapper)
+    finally:
+        controller.SetFrameEvent(restore_event, True)
+
+
+def parse_event_ids(text):
+    """parse text like `12, 30-45` into a list of event id"""
+    event_ids = []
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            event_ids.extend(range(int(start), int(end) + 1))
+        else:
+            event_ids.append(int(part))
+    return event_ids
+
+
+def show_success(manager, save_path, prof, result=None):
+    """`result` of the export, False when the file already hold the same content and is not written"""
+    # NOTE the batch export output a directory, the report go inside it
+    is_dir = os.path.isdir(save_path)
+    os.startfile(save_path if is_dir else os.path.dirname(save_path))
+    message = "FBX Ouput Sucessfully"
+    if result is False:
+        message = "%s is up to date, skipped\ntick `force rewrite` to write it anyway" % save_path
+    if prof.records:
+        report_path = prof.save(os.path.join(save_path, "batch") if is_dir else save_path)
+        message += "\n\n%s\n\nreport: %s" % (prof.summary(), report_path)
+    manager.MessageDialog(message, "Congradualtion!~")
+
+
+def start_background(manager, save_path, mapper, job, replay=None):
+    def fail(message):
+        manager.MessageDialog("FBX Ouput Fail\n%s" % message, "Error!~")
+
+    task = BackgroundExport(save_path, mapper, job, partial(show_success, manager, save_path), fail)
+    task.start(replay)
+    return task
+
+
+def block_invoke(pyrenderdoc, name, func, *args):
+    """run `func(*args, controller)` as a profiler stage on the replay thread and return its result"""
+    result = []
+
+    def callback(controller):
+        result.append(profiler.call(name, func, *(args + (controller,))))
 
-    # We'll decode the first three indices making up a triangle
-    idx_dict = data["IDX"]
-    value_dict = defaultdict(list)
-    vertex_data = defaultdict(dict)
-
-    for i, idx in enumerate(idx_dict):
-        for attr in attr_list:
-            value = data[attr][i]
-            value_dict[attr].append(value)
-            if idx not in vertex_data[attr]:
-                vertex_data[attr][idx] = value
-
-    ARGS = {
-        "model_name": save_name,
-        "LayerElementNormal": "",
-        "LayerElementNormalInsert": "",
-        "LayerElementBiNormal": "",
-        "LayerElementBiNormalInsert": "",
-        "LayerElementTangent": "",
-        "LayerElementTangentInsert": "",
-        "LayerElementColor": "",
-        "LayerElementColorInsert": "",
-        "LayerElementUV": "",
-        "LayerElementUVInsert": "",
-        "LayerElementUV2": "",
-        "LayerElementUV2Insert": "",
-    }
-
-    POSITION = mapper.get("POSITION")
-    NORMAL = mapper.get("NORMAL")
-    BINORMAL = mapper.get("BINORMAL")
-    TANGENT = mapper.get("TANGENT")
-    COLOR = mapper.get("COLOR")
-    UV = mapper.get("UV")
-    UV2 = mapper.get("UV2")
-    ENGINE = mapper.get("ENGINE")
-
-    min_poly = min(idx_dict)
-    idx_list = [idx - min_poly for idx in idx_dict]
-    # idx_data = ",".join([str(idx) for idx in idx_list])
-    idx_len = len(idx_list)
-
-    class ProcessHandler(object):
-        def run(self):
-            curr = time.time()
-            for name, func in inspect.getmembers(self, inspect.isroutine):
-                if name.startswith("run_"):
-                    func()
-            print("elapsed time template: %s" % (time.time() - curr))
-
-        def run_vertices(self):
-            vertices = [str(v) for idx, values in sorted(vertex_data[POSITION].items()) for v in values[:3]]
-            ARGS["vertices"] = ",".join(vertices)
-            ARGS["vertices_num"] = len(vertices)
-
-        def run_polygons(self):
-            polygons = [str(idx ^ -1 if i % 3 == 2 else idx) for i, idx in enumerate(idx_list)]
-            ARGS["polygons"] = ",".join(polygons)
-            ARGS["polygons_num"] = len(polygons)
-
-        def run_normals(self):
-            if not vertex_data.get(NORMAL):
-                return
-
-            # NOTE FBX_ASCII only support 3 dimension
-            normals = [str(v) for values in value_dict[NORMAL] for v in values[:3]]
-
-            ARGS[
-                "LayerElementNormal"
-            ] = """
-                LayerElementNormal: 0 {
-                    Version: 101
-                    Name: ""
-                    MappingInformationType: "ByPolygonVertex"
-                    ReferenceInformationType: "Direct"
-                    Normals: *%(normals_num)s {
-                        a: %(normals)s
-                    } 
-                }
-            """ % {
-                "normals": ",".join(normals),
-                "normals_num": len(normals),
-            }
-            ARGS[
-                "LayerElementNormalInsert"
-            ] = """
-                LayerElement:  {
-                        Type: "LayerElementNormal"
-                    TypedIndex: 0
-                }
-            """
-
-        def run_binormals(self):
-            if not vertex_data.get(BINORMAL):
-                return
-            # NOTE FBX_ASCII only support 3 dimension
-            binormals = [str(-v) for values in value_dict[BINORMAL] for v in values[:3]]
-
-            ARGS[
-                "LayerElementBiNormal"
-            ] = """
-                LayerElementBinormal: 0 {
-                    Version: 101
-                    Name: "map1"
-                    MappingInformationType: "ByVertice"
-                    ReferenceInformationType: "Direct"
-                    Binormals: *%(binormals_num)s {
-                        a: %(binormals)s
-                    } 
-                    BinormalsW: *%(binormalsW_num)s {
-                        a: %(binormalsW)s
-                    } 
-                }
-            """ % {
-                "binormals": ",".join(binormals),
-                "binormals_num": len(binormals),
-                "binormalsW": ",".join(["1" for i in range(idx_len)]),
-                "binormalsW_num": idx_len,
-            }
-            ARGS[
-                "LayerElementBiNormalInsert"
-            ] = """
-                LayerElement:  {
-                        Type: "LayerElementBinormal"
-                    TypedIndex: 0
-                }
-            """
-
-        def run_tangents(self):
-            if not vertex_data.get(TANGENT):
-                return
-
-            tangents = [str(v) for values in value_dict[TANGENT] for v in values[:3]]
-
-            ARGS[
-                "LayerElementTangent"
-            ] = """
-                LayerElementTangent: 0 {
-                    Version: 101
-                    Name: "map1"
-                    MappingInformationType: "ByPolygonVertex"
-                    ReferenceInformationType: "Direct"
-                    Tangents: *%(tangents_num)s {
-                        a: %(tangents)s
-                    } 
-                }
-            """ % {
-                "tangents": ",".join(tangents),
-                "tangents_num": len(tangents),
-            }
-
-            ARGS[
-                "LayerElementTangentInsert"
-            ] = """
-                    LayerElement:  {
-                        Type: "LayerElementTangent"
-                        TypedIndex: 0
-                    }
-            """
-
-        def run_color(self):
-            if not vertex_data.get(COLOR):
-                return
-
-            colors = [
-                # str(v) if i % 4 else "1"
-                str(v)
-                for values in value_dict[COLOR]
-                for i, v in enumerate(values, 1)
-            ]
-
-            ARGS[
-                "LayerElementColor"
-            ] = """
-                LayerElementColor: 0 {
-                    Version: 101
-                    Name: "colorSet1"
-                    MappingInformationType: "ByPolygonVertex"
-                    ReferenceInformationType: "IndexToDirect"
-                    Colors: *%(colors_num)s {
-                        a: %(colors)s
-                    } 
-                    ColorIndex: *%(colors_indices_num)s {
-                        a: %(colors_indices)s
-                    } 
-                }
-            """ % {
-                "colors": ",".join(colors),
-                "colors_num": len(colors),
-                "colors_indices": ",".join([str(i) for i in range(idx_len)]),
-                "colors_indices_num": idx_len,
-            }
-            ARGS[
-                "LayerElementColorInsert"
-            ] = """
-                LayerElement:  {
-                    Type: "LayerElementColor"
-                    TypedIndex: 0
-                }
-            """
-
-        def run_uv(self):
-            if not vertex_data.get(UV):
-                return
-
-            uvs_indices = ",".join([str(idx) for idx in idx_list])
-            uvs = [
-                # NOTE flip y axis
-                str(1 - v if i else v)
-                for idx, values in sorted(vertex_data[UV].items())
-                for i, v in enumerate(values)
-            ]
-
-            ARGS[
-                "LayerElementUV"
-            ] = """
-                LayerElementUV: 0 {
-                    Version: 101
-                    Name: "map1"
-                    MappingInformationType: "ByPolygonVertex"
-                    ReferenceInformationType: "IndexToDirect"
-                    UV: *%(uvs_num)s {
-                        a: %(uvs)s
-                    } 
-                    UVIndex: *%(uvs_indices_num)s {
-                        a: %(uvs_indices)s
-                    } 
-                }
-            """ % {
-                "uvs": ",".join(uvs),
-                "uvs_num": len(uvs),
-                "uvs_indices": uvs_indices,
-                "uvs_indices_num": idx_len,
-            }
-
-            ARGS[
-                "LayerElementUVInsert"
-            ] = """
-                LayerElement:  {
-                    Type: "LayerElementUV"
-                    TypedIndex: 0
-                }
-            """
-
-        def run_uv2(self):
-            if not vertex_data.get(UV2):
-                return
-
-            uvs_indices = ",".join([str(idx) for idx in idx_list])
-            uvs = [
-                # NOTE flip y axis
-                str(1 - v if i else v)
-                for idx, values in sorted(vertex_data[UV2].items())
-                for i, v in enumerate(values)
-            ]
-
-            ARGS[
-                "LayerElementUV2"
-            ] = """
-                LayerElementUV: 1 {
-                    Version: 101
-                    Name: "map2"
-                    MappingInformationType: "ByPolygonVertex"
-                    ReferenceInformationType: "IndexToDirect"
-                    UV: *%(uvs_num)s {
-                        a: %(uvs)s
-                    } 
-                    UVIndex: *%(uvs_indices_num)s {
-                        a: %(uvs_indices)s
-                    } 
-                }
-            """ % {
-                "uvs": ",".join(uvs),
-                "uvs_num": len(uvs),
-                "uvs_indices": uvs_indices,
-                "uvs_indices_num": idx_len,
-            }
-
-            ARGS[
-                "LayerElementUV2Insert"
-            ] = """
-                LayerElement:  {
-                    Type: "LayerElementUV"
-                    TypedIndex: 1
-                }
-            """
-
-    handler = ProcessHandler()
-    handler.run()
-
-    fbx = FBX_ASCII_TEMPLETE % ARGS
-
-    with open(save_path, "w") as f:
-        f.write(dedent(fbx).strip())
+    pyrenderdoc.Replay().BlockInvoke(callback)
+    return result[0] if result else None
 
 
 def error_log(func):
-    def wrapper(pyrenderdoc, data):
+    def wrapper(pyrenderdoc, data, **kwargs):
         manager = pyrenderdoc.Extensions()
         try:
-            func(pyrenderdoc, data)
+            func(pyrenderdoc, data, **kwargs)
+        except UnsupportedMesh as error:
+            # NOTE a valid draw the export can not handle, not a bug
+            manager.MessageDialog("FBX Ouput Fail\n%s" % error, "Error!~")
         except:
-            import traceback
-
             manager.MessageDialog("FBX Ouput Fail\n%s" % traceback.format_exc(), "Error!~")
 
     return wrapper
 
 
+def collect_replay_data(pyrenderdoc):
+    """fetch the vertex inputs from the replay controller in bulk"""
+    result = {}
+
+    def callback(controller):
+        try:
+            result["mesh"] = profiler.call("fetch replay", fetch_mesh_data, controller, pyrenderdoc.CurAction())
+        except UnsupportedFormat:
+            # NOTE fallback to the table scrape
+            traceback.print_exc()
+        except Exception:
+            # NOTE raise on the UI thread, not inside the replay callback
+            result["error"] = sys.exc_info()
+
+    pyrenderdoc.Replay().BlockInvoke(callback)
+    if "error" in result:
+        raise result["error"][1].with_traceback(result["error"][2])
+    return result.get("mesh", (None, None))
+
+
+def vsin_model(pyrenderdoc):
+    # NOTE Get Data from QTableView directly
+    main_window = pyrenderdoc.GetMainWindow().Widget()
+    table = main_window.findChild(QtWidgets.QTableView, "vsinData")
+    return table.model()
+
+
+def table_layout(pyrenderdoc):
+    """column headers and row count of the Mesh Viewer table, cheap to read"""
+    model = vsin_model(pyrenderdoc)
+    headers = [model.headerData(c, QtCore.Qt.Horizontal) for c in range(model.columnCount())]
+    return headers + [model.rowCount()]
+
+
+def collect_table_data(pyrenderdoc, mapper):
+    model = vsin_model(pyrenderdoc)
+    # NOTE skip the vertex inputs the mapper do not refer
+    attrs = mapped_attributes(mapper)
+    data, attr_list = collect_model_data(model, QtCore.Qt.Horizontal, MProgressDialog.loop, attrs)
+    # NOTE parse into memory mapped files when the rows would exceed the memory budget
+    size = spill.rows_bytes(model.rowCount(), [len(data[attr]) for attr in attr_list])
+    spilled = spill.over_budget(size, mapper)
+    data = rearrange_model_data(data, attr_list, model.rowCount(), MProgressDialog.loop, spilled)
+    # NOTE strips and fans become a triangle list like the replay fetch
+    return triangulate(data, attr_list, *primitive_topology(pyrenderdoc.CurPipelineState())), attr_list
+
+
+def collect_table_pipeline(pyrenderdoc, mapper):
+    """`collect_table_data` building the FBX layers of every collected attribute on a worker thread"""
+    model = vsin_model(pyrenderdoc)
+    attrs = mapped_attributes(mapper)
+    heads = [model.headerData(c, QtCore.Qt.Horizontal) for c in range(model.columnCount())]
+    widths = [sum(1 for head in heads if "." in head and head.split(".")[0] == attr) for attr in attrs]
+    # NOTE the component count come from the headers, decide the spill before any cell is read
+    spilled = spill.over_budget(spill.rows_bytes(model.rowCount(), widths), mapper)
+    topology, restart = primitive_topology(pyrenderdoc.CurPipelineState())
+    loop = MProgressDialog.loop
+    return pipeline.collect_encode(model, QtCore.Qt.Horizontal, mapper, loop, spilled, topology, restart)
+
+
 @error_log
-def prepare_export(pyrenderdoc, data):
+def prepare_export(pyrenderdoc, data, export=export_fbx, title="Save FBX File", file_filter="*.fbx"):
+    """`export` is `export_fbx` or `export_glb`, both share the collection and the cache"""
     manager = pyrenderdoc.Extensions()
     if not pyrenderdoc.HasMeshPreview():
         manager.ErrorDialog("No preview mesh!", "Error")
@@ -441,52 +284,145 @@ def prepare_export(pyrenderdoc, data):
     if not mqt.ShowWidgetAsDialog(dialog.init_ui()):
         return
 
-    save_path = manager.SaveFileName("Save FBX File", "", "*.fbx")
+    save_path = manager.SaveFileName(title, "", file_filter)
     if not save_path:
         return
 
     current = time.time()
 
-    # NOTE Get Data from QTableView directly
+    configure_cache(dialog.mapper)
+    layout = table_layout(pyrenderdoc)
+    key = cache_key(capture_identity(pyrenderdoc), pyrenderdoc.CurEvent(), layout)
+    # NOTE the table scrape only keep the mapped inputs, an entry missing one of them is collected again
+    attrs = mapped_attributes(dialog.mapper) & {head.split(".")[0] for head in layout[:-1] if "." in head}
+
+    with profiler.mapper_session(dialog.mapper) as prof:
+        with prof.stage("collect"):
+            # NOTE only the template or the output path changed, skip the collection
+            cached = MESH_CACHE.get(key, attrs)
+            if cached:
+                data, attr_list = cached
+            else:
+                data, attr_list = collect_replay_data(pyrenderdoc)
+                if not data:
+                    # NOTE the replay callback is done, the main thread can take over the cProfile
+                    with prof.profile_thread():
+                        pipelined = not dialog.mapper.get("HELPER") and not generate.enabled(dialog.mapper)
+                        if export is export_fbx and pipelined:
+                            # NOTE the layers are built while the next attribute is collected
+                            # the generated normals and tangents need every column, not pipelined
+                            data, attr_list, geometry = collect_table_pipeline(pyrenderdoc, dialog.mapper)
+                            export = partial(export_fbx, geometry=geometry)
+                        else:
+                            data, attr_list = collect_table_data(pyrenderdoc, dialog.mapper)
+                if data:
+                    MESH_CACHE.put(key, data, attr_list)
+
+        print("elapsed time unpack: %s" % (time.time() - current))
+        if dialog.mapper.get("HELPER"):
+            # NOTE the columns go through shared memory, the export run in a system python
+            export = partial(helper.export_remote, export=export)
+        if dialog.mapper.get("BACKGROUND"):
+            # NOTE the serialization do not need the replay controller, run it on a python thread
+            job = partial(export, save_path, dialog.mapper, data, attr_list)
+            start_background(manager, save_path, dialog.mapper, job)
+            return
+
+        result = block_invoke(pyrenderdoc, "export", export, save_path, dialog.mapper, data, attr_list)
+
+    if os.path.exists(save_path):
+        show_success(manager, save_path, prof, result)
+
+
+@error_log
+def prepare_scene_export(pyrenderdoc, data, export=export_fbx_scene, title="Export FBX Scene"):
+    """`export` is `export_fbx_scene` or `export_vertex_animation`, both take the same event list"""
+    manager = pyrenderdoc.Extensions()
+    if not pyrenderdoc.IsCaptureLoaded():
+        manager.ErrorDialog("No capture loaded!", "Error")
+        return
+
     main_window = pyrenderdoc.GetMainWindow().Widget()
-    table = main_window.findChild(QtWidgets.QTableView, "vsinData")
+    text, ok = QtWidgets.QInputDialog.getText(main_window, title, "Event IDs (e.g. 12, 30-45)")
+    if not ok:
+        return
 
-    model = table.model()
-    row_count = model.rowCount()
-    column_count = model.columnCount()
-    rows = range(row_count)
-    columns = range(column_count)
+    actions = [pyrenderdoc.GetAction(event_id) for event_id in parse_event_ids(text)]
+    actions = [action for action in actions if action and action.numIndices]
+    if not actions:
+        manager.ErrorDialog("No draw call in the given events!", "Error")
+        return
 
-    data = defaultdict(list)
-    attr_list = set()
+    mqt = manager.GetMiniQtHelper()
+    dialog = QueryDialog(mqt)
+    if not mqt.ShowWidgetAsDialog(dialog.init_ui()):
+        return
 
-    for _, c in MProgressDialog.loop(columns, status="Collect Mesh Data"):
-        head = model.headerData(c, QtCore.Qt.Horizontal)
-        values = [model.data(model.index(r, c)) for r in rows]
-        if "." not in head:
-            data[head] = values
-        else:
-            attr = head.split(".")[0]
-            attr_list.add(attr)
-            data[attr].append(values)
+    save_path = manager.SaveFileName("Save FBX File", "", "*.fbx")
+    if not save_path:
+        return
 
-    for _, attr in MProgressDialog.loop(attr_list, status="Rearrange Mesh Data"):
-        values_list = data[attr]
-        data[attr] = [[float(values[r]) for values in values_list] for r in rows]
+    current = time.time()
+    configure_cache(dialog.mapper)
+    args = (save_path, dialog.mapper, actions, pyrenderdoc.CurEvent(), capture_identity(pyrenderdoc))
+    if dialog.mapper.get("BACKGROUND"):
+        # NOTE the replay commands from the UI queue up after the export
+        job = partial(export, *args)
+        start_background(manager, save_path, dialog.mapper, job, pyrenderdoc.Replay())
+        return
 
-    print("elapsed time unpack: %s" % (time.time() - current))
-    pyrenderdoc.Replay().BlockInvoke(partial(export_fbx, save_path, dialog.mapper, data, attr_list))
+    with profiler.mapper_session(dialog.mapper) as prof:
+        block_invoke(pyrenderdoc, "export scene", export, *args)
+    print("elapsed time scene: %s" % (time.time() - current))
 
     if os.path.exists(save_path):
-        os.startfile(os.path.dirname(save_path))
-        manager.MessageDialog("FBX Ouput Sucessfully", "Congradualtion!~")
+        show_success(manager, save_path, prof)
+
+
+@error_log
+def prepare_batch_export(pyrenderdoc, data):
+    manager = pyrenderdoc.Extensions()
+    if not pyrenderdoc.IsCaptureLoaded():
+        manager.ErrorDialog("No capture loaded!", "Error")
+        return
+
+    mqt = manager.GetMiniQtHelper()
+    dialog = QueryDialog(mqt)
+    if not mqt.ShowWidgetAsDialog(dialog.init_ui()):
+        return
+
+    directory = manager.OpenDirectoryName("Batch Export Directory")
+    if not directory:
+        return
+
+    current = time.time()
+    args = (directory, dialog.mapper, pyrenderdoc.CurEvent(), capture_identity(pyrenderdoc))
+    if dialog.mapper.get("BACKGROUND"):
+        job = partial(batch_export, *args)
+        start_background(manager, directory, dialog.mapper, job, pyrenderdoc.Replay())
+        return
+
+    with profiler.mapper_session(dialog.mapper) as prof:
+        block_invoke(pyrenderdoc, "batch export", batch_export, *args)
+    print("elapsed time batch: %s" % (time.time() - current))
+
+    show_success(manager, directory, prof)
 
 
 def register(version, pyrenderdoc):
     # version is the RenderDoc Major.Minor version as a string, such as "1.2"
     # pyrenderdoc is the CaptureContext handle, the same as the global available in the python shell
     print("Registering FBX Mesh Exporter extension for RenderDoc {}".format(version))
-    pyrenderdoc.Extensions().RegisterPanelMenu(qrenderdoc.PanelMenu.MeshPreview, ["Export FBX Mesh"], prepare_export)
+    manager = pyrenderdoc.Extensions()
+    manager.RegisterPanelMenu(qrenderdoc.PanelMenu.MeshPreview, ["Export FBX Mesh"], prepare_export)
+    glb_export = partial(prepare_export, export=export_glb, title="Save glTF Binary File", file_filter="*.glb")
+    manager.RegisterPanelMenu(qrenderdoc.PanelMenu.MeshPreview, ["Export glTF Binary"], glb_export)
+    manager.RegisterPanelMenu(qrenderdoc.PanelMenu.MeshPreview, ["Export FBX Scene"], prepare_scene_export)
+    manager.RegisterPanelMenu(qrenderdoc.PanelMenu.EventBrowser, ["Export FBX Scene"], prepare_scene_export)
+    manager.RegisterPanelMenu(qrenderdoc.PanelMenu.EventBrowser, ["Export All Draws"], prepare_batch_export)
+    animation_export = partial(prepare_scene_export, export=export_vertex_animation, title="Export Vertex Animation")
+    manager.RegisterPanelMenu(qrenderdoc.PanelMenu.MeshPreview, ["Export Vertex Animation"], animation_export)
+    manager.RegisterPanelMenu(qrenderdoc.PanelMenu.EventBrowser, ["Export Vertex Animation"], animation_export)
 
 
 def unregister():
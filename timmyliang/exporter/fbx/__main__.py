@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""
+python -m exporter.fbx
+"""
+
+from __future__ import absolute_import
+
+import sys
+
+from .cli import main
+
+# NOTE spawn workers import this module as __mp_main__
+if __name__ == "__main__":
+    sys.exit(main())
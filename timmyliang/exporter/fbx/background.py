@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+non blocking export
+
+the job run on a python thread or the RenderDoc replay thread,
+progress and result come back to the UI thread through Qt signals.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import threading
+import traceback
+
+from PySide2 import QtCore
+
+from . import profiler
+from .core import ExportCancelled
+from .topology import UnsupportedMesh
+from .progress_dialog import MProgressDialog
+
+
+class BackgroundExport(QtCore.QObject):
+    """run `job(controller, progress=...)` without blocking RenderDoc
+
+    the export write aside and rename, a cancelled or failed job keep the previous file.
+    """
+
+    progressed = QtCore.Signal(str)
+    # NOTE the job result, e.g. False when the output is up to date and skipped
+    succeeded = QtCore.Signal(object)
+    failed = QtCore.Signal(str)
+    cancelled = QtCore.Signal()
+
+    # NOTE hold the running exports, the python side would be garbage collected otherwise
+    running = []
+
+    def __init__(self, save_path, mapper, job, on_success=None, on_fail=None):
+        super(BackgroundExport, self).__init__()
+        self.save_path = save_path
+        self.mapper = mapper
+        self.job = job
+        self.on_success = on_success
+        self.on_fail = on_fail
+        self.cancel_event = threading.Event()
+        self.profiler = profiler.NULL
+        self.step = 0
+
+        name = os.path.basename(save_path)
+        self.dialog = MProgressDialog(status="Export %s" % name, title="Background Export", maximum=0)
+        # NOTE keep the capture usable while exporting
+        self.dialog.setWindowModality(QtCore.Qt.NonModal)
+        self.dialog.canceled.connect(self.cancel)
+
+        # NOTE the receiver live in the UI thread, emit from the job thread become queued
+        self.progressed.connect(self.update_label)
+        self.succeeded.connect(self.finish_success)
+        self.failed.connect(self.finish_fail)
+        self.cancelled.connect(self.finish_cancel)
+
+    def start(self, replay=None):
+        """run on a python thread, or on the replay thread when the job need the controller"""
+        BackgroundExport.running.append(self)
+        if replay is not None:
+            replay.AsyncInvoke("", self.run)
+        else:
+            thread = threading.Thread(target=self.run, args=(None,))
+            thread.daemon = True
+            thread.start()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def progress(self, name):
+        """called by the export at every layer and chunk"""
+        if self.cancel_event.is_set():
+            raise ExportCancelled()
+        self.step += 1
+        self.progressed.emit(name)
+
+    def run(self, controller):
+        try:
+            with profiler.mapper_session(self.mapper) as prof, prof.profile_thread():
+                self.profiler = prof
+                result = self.job(controller, progress=self.progress)
+        except ExportCancelled:
+            self.cancelled.emit()
+        except UnsupportedMesh as error:
+            # NOTE the message is enough, no traceback
+            self.failed.emit(str(error))
+        except Exception:
+            self.failed.emit(traceback.format_exc())
+        else:
+            self.succeeded.emit(result)
+
+    @QtCore.Slot(str)
+    def update_label(self, name):
+        if not self.cancel_event.is_set():
+            self.dialog.setLabelText("%s (step %s)" % (name, self.step))
+
+    def close(self):
+        self.dialog.deleteLater()
+        if self in BackgroundExport.running:
+            BackgroundExport.running.remove(self)
+
+    @QtCore.Slot(object)
+    def finish_success(self, result):
+        self.close()
+        if self.on_success:
+            self.on_success(self.profiler, result)
+
+    @QtCore.Slot(str)
+    def finish_fail(self, message):
+        self.close()
+        print(message)
+        if self.on_fail:
+            self.on_fail(message)
+
+    @QtCore.Slot()
+    def finish_cancel(self):
+        self.close()
+        print("export cancelled, %s is left as it was" % self.save_path)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+whole capture batch export
+
+the replay thread fetch the draws one by one, the worker processes serialize them into their own file.
+every exported draw is recorded in a json manifest, a later run skip the recorded events.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import json
+import time
+import traceback
+from collections import deque
+
+from . import parallel
+from .core import export_fbx, export_glb
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# NOTE rewrite the manifest every few draws instead of every draw, a crash only redo these
+SAVE_EVERY = 32
+
+
+def load_manifest(path, capture):
+    """manifest of a previous run on the same capture, a new one otherwise"""
+    manifest = {"version": MANIFEST_VERSION, "capture": capture, "entries": {}}
+    if not os.path.isfile(path):
+        return manifest
+    with open(path) as f:
+        previous = json.load(f)
+    # NOTE json turn the capture identity tuple into a list
+    if previous.get("version") != MANIFEST_VERSION or previous.get("capture") != json.loads(json.dumps(capture)):
+        print("%s belong to another capture, export every draw again" % path)
+        return manifest
+    manifest["entries"] = previous.get("entries", {})
+    return manifest
+
+
+def save_manifest(path, manifest):
+    # NOTE write aside then rename, a killed export never leave a truncated manifest
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(manifest, f, indent=4, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def iter_draws(actions):
+    """depth first draw calls with an index buffer, the same ones `Export FBX Scene` accept"""
+    for action in actions:
+        if action.numIndices:
+            yield action
+        for child in iter_draws(action.children):
+            yield child
+
+
+def draw_path(directory, event_id, mapper):
+    extension = ".glb" if mapper.get("FORMAT") == "glb" else ".fbx"
+    return os.path.join(directory, "event_%s%s" % (event_id, extension))
+
+
+def export_draw(job):
+    """serialize one fetched draw, run in the workers on parallel mode"""
+    event_id, save_path, mapper, data, attr_list, fetch_seconds = job
+    entry = {"event": event_id, "path": os.path.basename(save_path), "fetch_seconds": round(fetch_seconds, 6)}
+    current = time.time()
+    try:
+        export = export_glb if mapper.get("FORMAT") == "glb" else export_fbx
+        entry["written"] = bool(export(save_path, mapper, data, attr_list, None))
+    except Exception:
+        entry["error"] = traceback.format_exc()
+        return entry
+    entry["export_seconds"] = round(time.time() - current, 6)
+    entry["vertices"] = len(set(data["IDX"]))
+    entry["triangles"] = len(data["IDX"]) // 3
+    return entry
+
+
+def run_batch(manifest_path, manifest, jobs, mapper):
+    """export every `(event_id, save_path, data, attr_list, fetch_seconds)` of `jobs`
+
+    `jobs` is usually a generator fetching on the replay thread, it can raise to stop the batch,
+    the draws already sent still finish and are recorded.
+    return the failed entries.
+    """
+    # NOTE the draws are the parallel unit, no nested pool for the ASCII encoding
+    job_mapper = dict(mapper, WORKERS=0)
+    # NOTE independent of the ASCII `WORKERS`, every core by default
+    workers = mapper.get("BATCH_WORKERS")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    pool = parallel.create_pool(workers, mapper.get("PYTHON"))
+    # NOTE bound the fetched draws waiting for a worker
+    window = max(workers, 1) * 2
+    pending = deque()
+    failed = []
+
+    def record(entry):
+        if "error" in entry:
+            # NOTE not recorded, the next run try it again
+            print("event %s fail\n%s" % (entry["event"], entry["error"]))
+            failed.append(entry)
+            return
+        manifest["entries"][str(entry["event"])] = entry
+        if len(manifest["entries"]) % SAVE_EVERY == 0:
+            save_manifest(manifest_path, manifest)
+
+    try:
+        for event_id, save_path, data, attr_list, fetch_seconds in jobs:
+            job = (event_id, save_path, job_mapper, data, attr_list, fetch_seconds)
+            if pool is None:
+                record(export_draw(job))
+                continue
+            pending.append(pool.apply_async(export_draw, (job,)))
+            while len(pending) >= window:
+                record(pending.popleft().get())
+    finally:
+        while pending:
+            record(pending.popleft().get())
+        save_manifest(manifest_path, manifest)
+        parallel.close_pool(pool)
+
+    print("batch export: %s draws recorded, %s failed" % (len(manifest["entries"]), len(failed)))
+    return failed
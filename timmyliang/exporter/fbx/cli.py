@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+command line entry point
+
+convert vertex dumps to FBX without a GUI, e.g. on render farm nodes
+
+    python -m exporter.fbx mesh.csv -o mesh.fbx --template unreal --format binary
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import json
+import time
+import argparse
+
+from .core import TEMPLATES, scene_meshes, write_scene, write_aside, export_fbx, export_glb, export_animation
+from .core import parse_precision
+from .gltf_binary import glb_mesh, write_glb_scene
+from .mesh_io import read_mesh
+from .topology import TRIANGLE_TOPOLOGIES, triangulate
+from .generate import NORMAL_ENCODINGS
+from . import profiler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="exporter.fbx", description="Convert RenderDoc vertex dumps to FBX or glTF binary.")
+    parser.add_argument("inputs", nargs="+", help="Mesh Viewer .csv or .rdmc columnar dump, several inputs make a scene")
+    parser.add_argument("-o", "--output", required=True, help="output .fbx path")
+    parser.add_argument("-m", "--mapper", help="mapper json, same keys as the Attribute Query dialog")
+    parser.add_argument("-t", "--template", choices=list(TEMPLATES), default="unity", help="base attribute layout")
+    parser.add_argument("--format", choices=["ascii", "binary", "glb"], help="output format, glb for a `.glb` output")
+    parser.add_argument(
+        "--animation",
+        action="store_true",
+        help="the inputs are frames of one draw, write the first as FBX and all as a `.rdpc` point cache",
+    )
+    parser.add_argument(
+        "--topology",
+        choices=TRIANGLE_TOPOLOGIES,
+        default="TriangleList",
+        help="primitive topology of the dumped draw, converted to a triangle list",
+    )
+    parser.add_argument("--restart", type=lambda text: int(text, 0), help="primitive restart index, e.g. 0xFFFF")
+    parser.add_argument("--normal-encoding", choices=NORMAL_ENCODINGS, help="decode the packed NORMAL input")
+    parser.add_argument(
+        "--generate-normals", action="store_true", help="area weighted smooth normals when NORMAL is missing"
+    )
+    parser.add_argument(
+        "--generate-tangents", action="store_true", help="tangents from UV when TANGENT is missing, approximate MikkTSpace"
+    )
+    parser.add_argument("--compress", action="store_true", help="zlib compress binary arrays")
+    parser.add_argument("--dedup", action="store_true", help="write deduplicated IndexToDirect layers")
+    parser.add_argument("--quantize", type=int, help="decimal digits to round before deduplicate")
+    parser.add_argument(
+        "--precision",
+        nargs="?",
+        const="",
+        help="ASCII significant digits, default table or overrides like POSITION=7,UV=5",
+    )
+    parser.add_argument("--force", action="store_true", help="write even when the output hold the same content hash")
+    parser.add_argument("--workers", type=int, help="process pool size for the ASCII encoding")
+    parser.add_argument("--memory-budget", type=int, help="MB, spill to memory mapped files over this working set")
+    parser.add_argument("--profile", action="store_true", help="write a json stage report next to the output")
+    parser.add_argument("--profile-memory", action="store_true", help="trace the peak memory of every stage")
+    parser.add_argument("--cprofile", action="store_true", help="dump cProfile stats next to the output")
+    return parser.parse_args(argv)
+
+
+def load_mapper(args):
+    mapper = dict(TEMPLATES[args.template], ENGINE=args.template)
+    if args.mapper:
+        with open(args.mapper) as f:
+            mapper.update(json.load(f))
+
+    # NOTE the glTF binary is picked by the output extension too
+    if not args.format and args.output.lower().endswith(".glb"):
+        args.format = "glb"
+    options = {
+        "FORMAT": args.format,
+        "COMPRESS": args.compress or None,
+        "DEDUP": args.dedup or None,
+        "QUANTIZE": args.quantize,
+        "WORKERS": args.workers,
+        "FORCE": args.force or None,
+        "NORMAL_ENCODING": args.normal_encoding,
+        "GENERATE_NORMALS": args.generate_normals or None,
+        "GENERATE_TANGENTS": args.generate_tangents or None,
+        "PRECISION": None if args.precision is None else parse_precision(args.precision),
+        "MEMORY_BUDGET": args.memory_budget,
+        "PROFILE": args.profile or None,
+        "PROFILE_MEMORY": args.profile_memory or None,
+        "CPROFILE": args.cprofile or None,
+    }
+    mapper.update({key: value for key, value in options.items() if value is not None})
+    return mapper
+
+
+def read_input(path, args):
+    data, attr_list = read_mesh(path)
+    return triangulate(data, attr_list, args.topology, args.restart), attr_list
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    mapper = load_mapper(args)
+    current = time.time()
+
+    with profiler.mapper_session(mapper) as prof, prof.profile_thread():
+        if args.animation:
+
+            def frames():
+                for frame, path in enumerate(args.inputs):
+                    with prof.stage("read %s" % os.path.basename(path)):
+                        data, attr_list = read_input(path, args)
+                    yield frame, data, attr_list
+
+            print("point cache: %s" % export_animation(args.output, mapper, frames()))
+        elif len(args.inputs) == 1:
+            with prof.stage("read"):
+                data, attr_list = read_input(args.inputs[0], args)
+            export = export_glb if mapper.get("FORMAT") == "glb" else export_fbx
+            export(args.output, mapper, data, attr_list, None)
+        else:
+
+            def items():
+                for path in args.inputs:
+                    name = os.path.basename(os.path.splitext(path)[0])
+                    with prof.stage("read %s" % name):
+                        data, attr_list = read_input(path, args)
+                    yield name, data, attr_list
+
+            if mapper.get("FORMAT") == "glb":
+                with write_aside(args.output) as temp_path:
+                    write_glb_scene(temp_path, scene_meshes(items(), mapper, build=glb_mesh))
+            else:
+                write_scene(args.output, mapper, scene_meshes(items(), mapper), len(args.inputs))
+
+    print("elapsed time export: %s" % (time.time() - current))
+    if prof.records:
+        print(prof.summary())
+        print("profile report: %s" % prof.save(args.output))
+    return 0
@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+"""
+headless export core
+
+mesh building and FBX writing without PySide2 or qrenderdoc,
+shared by the RenderDoc extension and the command line.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import array
+from itertools import chain
+from contextlib import contextmanager
+from collections import defaultdict
+
+from . import profiler
+from . import spill
+from . import fingerprint
+from . import point_cache
+from . import numpy_engine
+from . import generate
+from .fbx_ascii import write_ascii_scene, DEFAULT_PRECISION
+from .fbx_binary import write_binary_scene
+from .gltf_binary import glb_mesh, write_glb_scene
+from .dedup import dedup_values
+from .remap import dense_remap
+from .mesh_data import Mesh
+from .layer_handler import LayerHandler
+
+# NOTE attribute layout of the engine templates
+TEMPLATES = {
+    "unity": {
+        "POSITION": "POSITION",
+        "TANGENT": "TANGENT",
+        "BINORMAL": "",
+        "NORMAL": "NORMAL",
+        "COLOR": "COLOR",
+        "UV": "TEXCOORD0",
+        "UV2": "TEXCOORD1",
+    },
+    "unreal": {
+        "POSITION": "ATTRIBUTE0",
+        "TANGENT": "ATTRIBUTE1",
+        "BINORMAL": "",
+        "NORMAL": "ATTRIBUTE2",
+        "COLOR": "ATTRIBUTE13",
+        "UV": "ATTRIBUTE5",
+        "UV2": "ATTRIBUTE6",
+    },
+}
+
+
+# NOTE mapper keys refer to a vertex input
+ATTRIBUTE_KEYS = ("POSITION", "NORMAL", "BINORMAL", "TANGENT", "COLOR", "UV", "UV2")
+# NOTE vertex inputs stored per frame by the animation export
+ANIMATED_KEYS = ("POSITION", "NORMAL")
+
+
+class ExportCancelled(Exception):
+    """raised by the `progress` callback to stop the export"""
+
+
+def parse_precision(text=""):
+    """parse text like `POSITION=6,UV=4` over the default significant digits"""
+    precision = dict(DEFAULT_PRECISION)
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+        attr, digits = part.split("=", 1)
+        precision[attr.upper()] = int(digits)
+    return precision
+
+
+def aside_path(path):
+    return path + ".tmp"
+
+
+@contextmanager
+def write_aside(path):
+    """yield a temporary path next to `path`, renamed over it once the block succeed
+
+    a failed or cancelled export keep the previous file, never leave a partial one.
+    """
+    temp_path = aside_path(path)
+    try:
+        yield temp_path
+        # NOTE nothing written, e.g. no frame to cache
+        if os.path.exists(temp_path):
+            os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def plain_loop(seq, **kwargs):
+    """same signature as `MProgressDialog.loop` without the progress bar"""
+    return enumerate(seq, 1)
+
+
+def mapped_attributes(mapper):
+    """vertex inputs the mapper refer to"""
+    return {mapper[key] for key in ATTRIBUTE_KEYS if mapper.get(key)}
+
+
+def collect_model_data(model, orientation, loop=plain_loop, attrs=None):
+    """read the cells of the Mesh Viewer table model column by column
+
+    `attrs` only read the columns of these vertex inputs, the plain columns like `IDX` are always read.
+    """
+    rows = range(model.rowCount())
+    heads = [(c, model.headerData(c, orientation)) for c in range(model.columnCount())]
+    if attrs is not None:
+        heads = [(c, head) for c, head in heads if "." not in head or head.split(".")[0] in attrs]
+
+    data = defaultdict(list)
+    attr_list = set()
+
+    for _, (c, head) in loop(heads, status="Collect Mesh Data"):
+        values = [model.data(model.index(r, c)) for r in rows]
+        if "." not in head:
+            data[head] = values
+        else:
+            attr = head.split(".")[0]
+            attr_list.add(attr)
+            data[attr].append(values)
+
+    return data, attr_list
+
+
+def table_mesh(indices, spilled=False):
+    """the compact `Mesh` of the table scrape and the first corner of every vertex
+
+    (None, None) when the rows stay in the data dict, with numpy or `spilled`.
+    """
+    if spilled or numpy_engine.np is not None:
+        return None, None
+    # NOTE the table repeat the vertex on every corner, only parse its first corner
+    corners, first = dense_remap(indices)
+    return Mesh(indices, corners), first
+
+
+def rearrange_attribute(data, mesh, first, attr, values_list, row_count, spilled=False):
+    """parse the component columns of one attribute into `mesh`, or into `data` when `mesh` is None"""
+    if spilled:
+        data[attr] = spill.SpillColumn.from_columns(values_list, row_count)
+    elif mesh is not None:
+        columns = [[values[c] for c in first] for values in values_list]
+        mesh.add(attr, array.array("d", map(float, chain.from_iterable(zip(*columns)))), len(columns))
+    else:
+        data[attr] = numpy_engine.parse_columns(values_list, row_count)
+
+
+def rearrange_model_data(data, attr_list, row_count, loop=plain_loop, spilled=False):
+    """turn the component columns of every attribute into per row values, return the new data
+
+    every column is parsed in one go, the rows become a float64 array when numpy is available,
+    a compact `Mesh` of per vertex values otherwise.
+    `spilled` parse the rows straight into memory mapped `SpillColumn`.
+    """
+    mesh, first = table_mesh(data["IDX"], spilled)
+    for _, attr in loop(attr_list, status="Rearrange Mesh Data"):
+        rearrange_attribute(data, mesh, first, attr, data[attr], row_count, spilled)
+    return data if mesh is None else mesh
+
+
+def geometry_handler(mapper, data, attr_list, spilled=None):
+    """the pure python `ProcessHandler`, every `run_` method build one layer
+
+    `spilled` None check the columns of `data` now, the pipelined collection pass it.
+    """
+    if spilled is None:
+        spilled = spill.is_spilled(data, attr_list)
+    # We'll decode the first three indices making up a triangle
+    idx_dict = data["IDX"]
+    # NOTE compacted index and the first corner of every vertex, shared by all the layers
+    idx_list, vertex_order = dense_remap(idx_dict)
+
+    def corner_values(attr):
+        """per corner rows of the attribute, None if not collected"""
+        if attr not in attr_list or not len(data[attr]):
+            return None
+        return data[attr]
+
+    POSITION = mapper.get("POSITION")
+    NORMAL = mapper.get("NORMAL")
+    BINORMAL = mapper.get("BINORMAL")
+    TANGENT = mapper.get("TANGENT")
+    COLOR = mapper.get("COLOR")
+    UV = mapper.get("UV")
+    UV2 = mapper.get("UV2")
+    ENGINE = mapper.get("ENGINE")
+    DEDUP = mapper.get("DEDUP")
+    QUANTIZE = mapper.get("QUANTIZE")
+
+    # idx_data = ",".join([str(idx) for idx in idx_list])
+    idx_len = len(idx_list)
+
+    class ProcessHandler(LayerHandler):
+        def __init__(self):
+            super(ProcessHandler, self).__init__(spilled)
+            self.idx_len = idx_len
+
+        def run_vertices(self):
+            rows = corner_values(POSITION)
+            vertices = [v for i in vertex_order for v in rows[i][:3]] if rows is not None else []
+            self.geometry["vertices"] = vertices
+
+        def run_polygons(self):
+            polygons = [idx ^ -1 if i % 3 == 2 else idx for i, idx in enumerate(idx_list)]
+            self.geometry["polygons"] = polygons
+
+        def run_normals(self):
+            rows = corner_values(NORMAL)
+            if rows is None:
+                return
+
+            # NOTE FBX_ASCII only support 3 dimension
+            if DEDUP:
+                rows = [values[:3] for values in rows]
+                self.geometry["normals"], self.geometry["normals_indices"] = dedup_values(rows, QUANTIZE)
+            else:
+                self.geometry["normals"] = [v for values in rows for v in values[:3]]
+
+        def run_binormals(self):
+            rows = corner_values(BINORMAL)
+            if rows is None:
+                return
+            # NOTE FBX_ASCII only support 3 dimension
+            self.geometry["binormals"] = [-v for values in rows for v in values[:3]]
+            self.geometry["binormalsW"] = [1] * idx_len
+
+        def run_tangents(self):
+            rows = corner_values(TANGENT)
+            if rows is None:
+                return
+
+            if DEDUP:
+                rows = [values[:3] for values in rows]
+                self.geometry["tangents"], self.geometry["tangents_indices"] = dedup_values(rows, QUANTIZE)
+            else:
+                self.geometry["tangents"] = [v for values in rows for v in values[:3]]
+
+        def run_color(self):
+            rows = corner_values(COLOR)
+            if rows is None:
+                return
+
+            if DEDUP:
+                self.geometry["colors"], self.geometry["colors_indices"] = dedup_values(rows, QUANTIZE)
+            else:
+                self.geometry["colors"] = [v for values in rows for v in values]
+                self.geometry["colors_indices"] = list(range(idx_len))
+
+        def run_uv(self):
+            rows = corner_values(UV)
+            if rows is None:
+                return
+
+            self.geometry["uvs"] = [
+                # NOTE flip y axis
+                1 - v if i else v
+                for c in vertex_order
+                for i, v in enumerate(rows[c])
+            ]
+            self.geometry["uvs_indices"] = idx_list
+
+        def run_uv2(self):
+            rows = corner_values(UV2)
+            if rows is None:
+                return
+
+            self.geometry["uv2s"] = [
+                # NOTE flip y axis
+                1 - v if i else v
+                for c in vertex_order
+                for i, v in enumerate(rows[c])
+            ]
+            self.geometry["uv2s_indices"] = idx_list
+
+    return ProcessHandler()
+
+
+def build_geometry(mapper, data, attr_list, progress=None):
+    handler = geometry_handler(mapper, data, attr_list)
+    with profiler.stage("geometry", count=handler.idx_len):
+        handler.run(progress)
+    return handler.geometry
+
+
+def engine_handler(mapper, data, attr_list, spilled=None):
+    """`ProcessHandler` of the vectorized engine when numpy is available, the pure python one otherwise"""
+    if numpy_engine.np is not None:
+        return numpy_engine.ProcessHandler(mapper, data, attr_list, spilled)
+    return geometry_handler(mapper, data, attr_list, spilled)
+
+
+def mesh_geometry(mapper, data, attr_list, progress=None):
+    """`progress` is called with the layer name, it can raise `ExportCancelled`"""
+    # NOTE decode the packed normals and generate the missing normals and tangents first
+    mapper, data, attr_list = generate.complete(mapper, data, attr_list, progress)
+    # NOTE use the vectorized engine when numpy is available
+    if numpy_engine.np is not None:
+        return numpy_engine.build_geometry(mapper, data, attr_list, progress)
+    return build_geometry(mapper, data, attr_list, progress)
+
+
+def write_scene(save_path, mapper, meshes, count, progress=None, content_hash=None):
+    creator = fingerprint.creator(content_hash) if content_hash else None
+    stage = profiler.stage("serialize %s" % (mapper.get("FORMAT") or "ascii"), count=count)
+    with stage, write_aside(save_path) as temp_path:
+        if mapper.get("FORMAT") == "binary":
+            write_binary_scene(temp_path, meshes, count, mapper.get("COMPRESS"), progress, creator)
+        else:
+            workers = mapper.get("WORKERS") or 0
+            python = mapper.get("PYTHON")
+            precision = mapper.get("PRECISION")
+            write_ascii_scene(
+                temp_path,
+                meshes,
+                count,
+                workers=workers,
+                python=python,
+                precision=precision,
+                progress=progress,
+                creator=creator,
+            )
+
+
+def scene_meshes(items, mapper, progress=None, build=mesh_geometry):
+    """turn (name, data, attr_list) items into (name, geometry, key) for `write_scene`
+
+    the key is the content hash, the geometry of a repeated mesh is not built again (None).
+    `build` is `glb_mesh` for the glTF scene.
+    """
+    built = set()
+    for name, data, attr_list in items:
+        data = spill.bound_memory(data, attr_list, mapper)
+        key = fingerprint.mesh_hash(data, mapped_attributes(mapper) & set(attr_list), mapper)
+        if key in built:
+            yield name, None, key
+            continue
+        built.add(key)
+        yield name, build(mapper, data, attr_list, progress), key
+
+
+def export_fbx(save_path, mapper, data, attr_list, controller, progress=None, geometry=None):
+    """return False when the file at `save_path` already hold the same content
+
+    `geometry` already built by the collection pipeline skip the layer building.
+    """
+
+    if not data:
+        # manager.ErrorDialog("Current Draw Call lack of Vertex. ", "Error")
+        return
+
+    save_name = os.path.basename(os.path.splitext(save_path)[0])
+    key = fingerprint.mesh_hash(data, mapped_attributes(mapper) & set(attr_list), mapper)
+    if not mapper.get("FORCE") and fingerprint.stored_hash(save_path) == key:
+        print("%s is up to date, skip export" % save_path)
+        return False
+    if geometry is None:
+        data = spill.bound_memory(data, attr_list, mapper)
+        geometry = mesh_geometry(mapper, data, attr_list, progress)
+    write_scene(save_path, mapper, [(save_name, geometry)], 1, progress, content_hash=key)
+    return True
+
+
+def export_animation(save_path, mapper, frames, progress=None, tolerance=0.0):
+    """export the first frame as the FBX topology and every frame as a delta encoded point cache
+
+    `frames` yield (event_id, data, attr_list) sharing one index buffer,
+    the mapped POSITION (and NORMAL when collected) go into `<name>.rdpc`, return the cache path.
+    """
+    cache_path = os.path.splitext(save_path)[0] + point_cache.CACHE_EXTENSION
+    writer = None
+    with write_aside(cache_path) as temp_path:
+        try:
+            for event_id, data, attr_list in frames:
+                if numpy_engine.np is not None:
+                    corners, first = numpy_engine.dense_remap(numpy_engine.np.asarray(data["IDX"], dtype="int64"))
+                else:
+                    corners, first = dense_remap(data["IDX"])
+
+                if writer is None:
+                    export_fbx(save_path, mapper, data, attr_list, None, progress)
+                    topology = corners
+                    attrs = [mapper.get(key) for key in ANIMATED_KEYS]
+                    attrs = [attr for attr in attrs if attr in attr_list and len(data[attr])]
+                    # NOTE FBX only keep 3 components of the position and normal
+                    attributes = [[attr, 3] for attr in attrs]
+                    writer = point_cache.PointCacheWriter(temp_path, len(first), attributes, tolerance)
+                elif not point_cache.same_topology(topology, corners):
+                    raise ValueError("event %s do not share the index buffer of the first event" % event_id)
+
+                if progress:
+                    progress("cache event %s" % event_id)
+                with profiler.stage("cache event %s" % event_id) as record:
+                    frame = {attr: point_cache.vertex_values(data[attr], first, 3) for attr, _ in writer.attributes}
+                    record["count"] = writer.add_frame(event_id, frame)
+        finally:
+            if writer is not None:
+                writer.close()
+    return cache_path
+
+
+def export_glb(save_path, mapper, data, attr_list, controller, progress=None):
+    """`export_fbx` counterpart writing a glTF binary, return False when the file is up to date"""
+
+    if not data:
+        return
+
+    save_name = os.path.basename(os.path.splitext(save_path)[0])
+    key = fingerprint.mesh_hash(data, mapped_attributes(mapper) & set(attr_list), mapper)
+    if not mapper.get("FORCE") and fingerprint.stored_hash(save_path) == key:
+        print("%s is up to date, skip export" % save_path)
+        return False
+    data = spill.bound_memory(data, attr_list, mapper)
+    with profiler.stage("glb mesh", count=len(data["IDX"])):
+        mesh = glb_mesh(mapper, data, attr_list, progress)
+    with profiler.stage("serialize glb", count=1), write_aside(save_path) as temp_path:
+        write_glb_scene(temp_path, [(save_name, mesh)], progress, fingerprint.creator(key))
+    return True
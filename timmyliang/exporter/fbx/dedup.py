@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+deduplicate attribute tuple into a value table plus an index array
+
+used by the IndexToDirect layers.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+
+def dedup_values(rows, quantize=None):
+    """hash every row into a table, return the flatten unique values and the index per row
+
+    :param rows: sequence of attribute tuples
+    :param quantize: optional decimal digits to round before hashing
+    """
+    table = {}
+    values = []
+    indices = []
+    # NOTE scale and round like `numpy.round` so both engines output the same table
+    scale = 10.0 ** quantize if quantize is not None else None
+    for row in rows:
+        # NOTE add zero turn -0.0 into 0.0 same as the numpy engine
+        if scale:
+            key = tuple([round(v * scale) / scale + 0.0 for v in row])
+        else:
+            key = tuple([v + 0.0 for v in row])
+        index = table.get(key)
+        if index is None:
+            index = table[key] = len(table)
+            values.extend(key)
+        indices.append(index)
+    return values, indices
@@ -0,0 +1,451 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming ASCII FBX writer
+
+each template is filled with placeholders first,
+then every array write straight to the file handle chunk by chunk.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+from . import parallel
+from .fbx_binary import GEOMETRY_ID, MODEL_ID
+
+# NOTE values join per write
+CHUNK_SIZE = 65536
+BUFFER_SIZE = 1 << 20
+SEPARATOR = "\x00"
+MARKER = SEPARATOR + "%s" + SEPARATOR
+
+# NOTE geometry array and the mapper attribute it come from
+ARRAY_ATTRIBUTES = {
+    "vertices": "POSITION",
+    "normals": "NORMAL",
+    "binormals": "BINORMAL",
+    "tangents": "TANGENT",
+    "colors": "COLOR",
+    "uvs": "UV",
+    "uv2s": "UV2",
+}
+# NOTE significant digits, enough for the float32 and half data in the captures
+DEFAULT_PRECISION = {
+    "POSITION": 6,
+    "NORMAL": 5,
+    "BINORMAL": 5,
+    "TANGENT": 5,
+    "COLOR": 4,
+    "UV": 4,
+    "UV2": 4,
+}
+
+FBX_ASCII_HEADER = """
+    ; FBX 7.3.0 project file
+    ; ----------------------------------------------------
+%(creator)s
+    ; Object definitions
+    ;------------------------------------------------------------------
+
+    Definitions:  {
+
+        ObjectType: "Geometry" {
+            Count: %(geometry_count)s
+            PropertyTemplate: "FbxMesh" {
+                Properties70:  {
+                    P: "Primary Visibility", "bool", "", "",1
+                }
+            }
+        }
+
+        ObjectType: "Model" {
+            Count: %(count)s
+            PropertyTemplate: "FbxNode" {
+                Properties70:  {
+                    P: "Visibility", "Visibility", "", "A",1
+                }
+            }
+        }
+    }
+
+    ; Object properties
+    ;------------------------------------------------------------------
+
+    Objects:  {"""
+
+FBX_ASCII_GEOMETRY = """
+        Geometry: %(geometry_id)s, "Geometry::", "Mesh" {
+            Vertices: *%(vertices_num)s {
+                a: %(vertices)s
+            } 
+            PolygonVertexIndex: *%(polygons_num)s {
+                a: %(polygons)s
+            } 
+            GeometryVersion: 124
+            %(LayerElementNormal)s
+            %(LayerElementBiNormal)s
+            %(LayerElementTangent)s
+            %(LayerElementColor)s
+            %(LayerElementUV)s
+            %(LayerElementUV2)s
+            Layer: 0 {
+                Version: 100
+                %(LayerElementNormalInsert)s
+                %(LayerElementBiNormalInsert)s
+                %(LayerElementTangentInsert)s
+                %(LayerElementColorInsert)s
+                %(LayerElementUVInsert)s
+                
+            }
+            Layer: 1 {
+                Version: 100
+                %(LayerElementUV2Insert)s
+            }
+        }"""
+
+FBX_ASCII_MODEL = """
+        Model: %(model_id)s, "Model::%(model_name)s", "Mesh" {
+            Properties70:  {
+                P: "DefaultAttributeIndex", "int", "Integer", "",0
+            }
+        }"""
+
+FBX_ASCII_CONNECTIONS = """
+    }
+
+    ; Object connections
+    ;------------------------------------------------------------------
+
+    Connections:  {"""
+
+FBX_ASCII_CONNECTION = """
+        
+        ;Model::%(model_name)s, Model::RootNode
+        C: "OO",%(model_id)s,0
+        
+        ;Geometry::, Model::%(model_name)s
+        C: "OO",%(geometry_id)s,%(model_id)s"""
+
+FBX_ASCII_FOOTER = """
+
+    }
+
+    """
+
+
+def iter_chunks(values, chunk_size=CHUNK_SIZE):
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start : start + chunk_size]
+        # NOTE numpy array convert to python number first
+        if hasattr(chunk, "tolist"):
+            chunk = chunk.tolist()
+        yield chunk
+
+
+def array_formats(precision):
+    """printf format of each geometry array, the arrays not listed keep the full `str` output"""
+    precision = precision or {}
+    return {key: "%%.%dg" % precision[attr] for key, attr in ARRAY_ATTRIBUTES.items() if precision.get(attr)}
+
+
+def encode_piece(piece):
+    """join the chunk values after the plain text prefix, run in the workers on parallel mode"""
+    text, chunk, fmt = piece
+    if chunk is None:
+        return text
+    if fmt is None:
+        return text + ",".join([str(v) for v in chunk])
+    # NOTE one printf call format the whole chunk
+    return text + ",".join([fmt] * len(chunk)) % tuple(chunk)
+
+
+def unindent(text):
+    """same as `textwrap.dedent` for the templates above which share a 4 spaces margin"""
+    return "\n".join([line[4:] if line.strip() else "" for line in text.split("\n")])
+
+
+def iter_pieces(text, arrays, chunk_size=CHUNK_SIZE, formats=None, progress=None):
+    formats = formats or {}
+    # NOTE split result alternate between plain text and array key
+    for i, part in enumerate(unindent(text).split(SEPARATOR)):
+        if not i % 2:
+            yield part, None, None
+            continue
+        fmt = formats.get(part)
+        for j, chunk in enumerate(iter_chunks(arrays[part], chunk_size)):
+            # NOTE report every chunk so the cancel take effect inside a large array
+            if progress:
+                progress("write %s" % part)
+            yield "," if j else "", chunk, fmt
+
+
+def write_text(f, text, arrays, chunk_size=CHUNK_SIZE, pool=None, window=16, formats=None, progress=None):
+    # NOTE pieces are encoded in order, in the pool when parallel mode is on
+    pieces = iter_pieces(text, arrays, chunk_size, formats, progress)
+    for encoded in parallel.imap(pool, encode_piece, pieces, window):
+        f.write(encoded)
+
+
+def mesh_text(geometry, ids):
+    """fill the mesh template with placeholders, return the text and the arrays they refer"""
+    arrays = {}
+
+    def placeholder(key):
+        # NOTE placeholder replaced by the chunked array when streaming
+        arrays[key] = geometry[key]
+        return MARKER % key
+
+    def reference(key):
+        return "IndexToDirect" if key in geometry else "Direct"
+
+    def index_block(name, key):
+        # NOTE IndexToDirect layer append the index array after the values
+        if key not in geometry:
+            return ""
+        block = "\n                    %s: *%s {\n                        a: %s\n                    } "
+        return block % (name, len(geometry[key]), placeholder(key))
+
+    ARGS = dict(
+        ids,
+        LayerElementNormal="",
+        LayerElementNormalInsert="",
+        LayerElementBiNormal="",
+        LayerElementBiNormalInsert="",
+        LayerElementTangent="",
+        LayerElementTangentInsert="",
+        LayerElementColor="",
+        LayerElementColorInsert="",
+        LayerElementUV="",
+        LayerElementUVInsert="",
+        LayerElementUV2="",
+        LayerElementUV2Insert="",
+    )
+
+    ARGS["vertices"] = placeholder("vertices")
+    ARGS["vertices_num"] = len(geometry["vertices"])
+
+    ARGS["polygons"] = placeholder("polygons")
+    ARGS["polygons_num"] = len(geometry["polygons"])
+
+    if "normals" in geometry:
+        ARGS["LayerElementNormal"] = """
+                LayerElementNormal: 0 {
+                    Version: 101
+                    Name: ""
+                    MappingInformationType: "ByPolygonVertex"
+                    ReferenceInformationType: "%(reference)s"
+                    Normals: *%(normals_num)s {
+                        a: %(normals)s
+                    } %(normals_indices)s
+                }
+            """ % {
+            "normals": placeholder("normals"),
+            "normals_num": len(geometry["normals"]),
+            "normals_indices": index_block("NormalsIndex", "normals_indices"),
+            "reference": reference("normals_indices"),
+        }
+        ARGS["LayerElementNormalInsert"] = """
+                LayerElement:  {
+                        Type: "LayerElementNormal"
+                    TypedIndex: 0
+                }
+            """
+
+    if "binormals" in geometry:
+        ARGS["LayerElementBiNormal"] = """
+                LayerElementBinormal: 0 {
+                    Version: 101
+                    Name: "map1"
+                    MappingInformationType: "ByVertice"
+                    ReferenceInformationType: "Direct"
+                    Binormals: *%(binormals_num)s {
+                        a: %(binormals)s
+                    } 
+                    BinormalsW: *%(binormalsW_num)s {
+                        a: %(binormalsW)s
+                    } 
+                }
+            """ % {
+            "binormals": placeholder("binormals"),
+            "binormals_num": len(geometry["binormals"]),
+            "binormalsW": placeholder("binormalsW"),
+            "binormalsW_num": len(geometry["binormalsW"]),
+        }
+        ARGS["LayerElementBiNormalInsert"] = """
+                LayerElement:  {
+                        Type: "LayerElementBinormal"
+                    TypedIndex: 0
+                }
+            """
+
+    if "tangents" in geometry:
+        ARGS["LayerElementTangent"] = """
+                LayerElementTangent: 0 {
+                    Version: 101
+                    Name: "map1"
+                    MappingInformationType: "ByPolygonVertex"
+                    ReferenceInformationType: "%(reference)s"
+                    Tangents: *%(tangents_num)s {
+                        a: %(tangents)s
+                    } %(tangents_indices)s
+                }
+            """ % {
+            "tangents": placeholder("tangents"),
+            "tangents_num": len(geometry["tangents"]),
+            "tangents_indices": index_block("TangentsIndex", "tangents_indices"),
+            "reference": reference("tangents_indices"),
+        }
+        ARGS["LayerElementTangentInsert"] = """
+                    LayerElement:  {
+                        Type: "LayerElementTangent"
+                        TypedIndex: 0
+                    }
+            """
+
+    if "colors" in geometry:
+        ARGS["LayerElementColor"] = """
+                LayerElementColor: 0 {
+                    Version: 101
+                    Name: "colorSet1"
+                    MappingInformationType: "ByPolygonVertex"
+                    ReferenceInformationType: "IndexToDirect"
+                    Colors: *%(colors_num)s {
+                        a: %(colors)s
+                    } 
+                    ColorIndex: *%(colors_indices_num)s {
+                        a: %(colors_indices)s
+                    } 
+                }
+            """ % {
+            "colors": placeholder("colors"),
+            "colors_num": len(geometry["colors"]),
+            "colors_indices": placeholder("colors_indices"),
+            "colors_indices_num": len(geometry["colors_indices"]),
+        }
+        ARGS["LayerElementColorInsert"] = """
+                LayerElement:  {
+                    Type: "LayerElementColor"
+                    TypedIndex: 0
+                }
+            """
+
+    if "uvs" in geometry:
+        ARGS["LayerElementUV"] = """
+                LayerElementUV: 0 {
+                    Version: 101
+                    Name: "map1"
+                    MappingInformationType: "ByPolygonVertex"
+                    ReferenceInformationType: "IndexToDirect"
+                    UV: *%(uvs_num)s {
+                        a: %(uvs)s
+                    } 
+                    UVIndex: *%(uvs_indices_num)s {
+                        a: %(uvs_indices)s
+                    } 
+                }
+            """ % {
+            "uvs": placeholder("uvs"),
+            "uvs_num": len(geometry["uvs"]),
+            "uvs_indices": placeholder("uvs_indices"),
+            "uvs_indices_num": len(geometry["uvs_indices"]),
+        }
+        ARGS["LayerElementUVInsert"] = """
+                LayerElement:  {
+                    Type: "LayerElementUV"
+                    TypedIndex: 0
+                }
+            """
+
+    if "uv2s" in geometry:
+        ARGS["LayerElementUV2"] = """
+                LayerElementUV: 1 {
+                    Version: 101
+                    Name: "map2"
+                    MappingInformationType: "ByPolygonVertex"
+                    ReferenceInformationType: "IndexToDirect"
+                    UV: *%(uvs_num)s {
+                        a: %(uvs)s
+                    } 
+                    UVIndex: *%(uvs_indices_num)s {
+                        a: %(uvs_indices)s
+                    } 
+                }
+            """ % {
+            "uvs": placeholder("uv2s"),
+            "uvs_num": len(geometry["uv2s"]),
+            "uvs_indices": placeholder("uv2s_indices"),
+            "uvs_indices_num": len(geometry["uv2s_indices"]),
+        }
+        ARGS["LayerElementUV2Insert"] = """
+                LayerElement:  {
+                    Type: "LayerElementUV"
+                    TypedIndex: 1
+                }
+            """
+
+    return (FBX_ASCII_GEOMETRY + FBX_ASCII_MODEL) % ARGS, arrays
+
+
+def write_ascii_scene(
+    save_path,
+    meshes,
+    count,
+    chunk_size=CHUNK_SIZE,
+    workers=0,
+    python=None,
+    precision=None,
+    progress=None,
+    creator=None,
+):
+    """stream every (name, geometry) of `meshes` into one file as a Geometry/Model pair
+
+    `meshes` can be a generator, each mesh is written as soon as it is yielded.
+    a (name, geometry, key) mesh whose key is already written only add a Model of the earlier Geometry.
+    `creator` is written as the file `Creator`, e.g. the content hash.
+    `workers` more than one encode the array chunks in a process pool.
+    `precision` map the attribute (`POSITION`, `UV` ...) to the significant digits written.
+    `progress` is called with the array being written, it can raise to stop the export.
+    """
+    formats = array_formats(precision)
+    connections = []
+    pool = parallel.create_pool(workers, python)
+    window = workers * 4
+    try:
+        with open(save_path, "w", BUFFER_SIZE) as f:
+            creator = '    Creator: "%s"\n' % creator if creator else ""
+            # NOTE the instanced meshes share a Geometry, its count is patched once every mesh is written
+            geometry_count = "%-10d" % count
+            text = unindent(FBX_ASCII_HEADER % {"count": count, "geometry_count": geometry_count, "creator": creator})
+            text = text.lstrip()
+            split = text.index("Count: " + geometry_count) + len("Count: ")
+            f.write(text[:split])
+            count_offset = f.tell()
+            f.write(text[split:])
+            geometry_ids = {}
+            for index, mesh in enumerate(meshes):
+                name, geometry = mesh[:2]
+                key = mesh[2] if len(mesh) > 2 else index
+                ids = {
+                    "model_name": name,
+                    "geometry_id": geometry_ids.get(key, GEOMETRY_ID + index),
+                    "model_id": MODEL_ID + index,
+                }
+                if key in geometry_ids:
+                    # NOTE identical mesh, instance the Geometry already written
+                    f.write(unindent(FBX_ASCII_MODEL % ids))
+                else:
+                    geometry_ids[key] = ids["geometry_id"]
+                    # NOTE the text only hold the placeholders, far smaller than the mesh
+                    text, arrays = mesh_text(geometry, ids)
+                    write_text(f, text, arrays, chunk_size, pool, window, formats, progress)
+                connections.append(FBX_ASCII_CONNECTION % ids)
+
+            f.write(unindent(FBX_ASCII_CONNECTIONS + "".join(connections) + FBX_ASCII_FOOTER).rstrip())
+            f.seek(count_offset)
+            f.write("%-10d" % len(geometry_ids))
+    finally:
+        parallel.close_pool(pool)
+
+
+def write_ascii(save_path, save_name, geometry, chunk_size=CHUNK_SIZE, workers=0, python=None, precision=None):
+    write_ascii_scene(save_path, [(save_name, geometry)], 1, chunk_size, workers, python, precision)
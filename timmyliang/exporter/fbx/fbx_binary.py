@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Binary FBX 7.4 writer
+
+the node layout mirror the `FBX_ASCII_TEMPLETE` output,
+array properties are packed as `d`/`i` arrays with optional zlib compression.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import sys
+import zlib
+import array
+import struct
+
+FBX_VERSION = 7400
+GEOMETRY_ID = 2035541511296
+MODEL_ID = 2035615390896
+
+HEAD_MAGIC = b"Kaydara FBX Binary  \x00\x1a\x00"
+FOOT_ID = b"\xfa\xbc\xab\x09\xd0\xc8\xd4\x66\xb1\x76\xfb\x83\x1c\xf7\x26\x7e"
+FOOT_MAGIC = b"\xf8\x5a\x8c\x6a\xde\xf5\xd9\x7e\xec\xe9\x0c\xe3\x75\x8f\x29\x0b"
+NULL_RECORD = b"\x00" * 13
+
+# NOTE arrays smaller than this are not worth the zlib header
+COMPRESS_THRESHOLD = 128
+
+SCALAR_FORMAT = {
+    "C": "?",
+    "Y": "h",
+    "I": "i",
+    "L": "q",
+    "F": "f",
+    "D": "d",
+}
+ARRAY_FORMAT = {
+    "b": "b",
+    "i": "i",
+    "l": "q",
+    "f": "f",
+    "d": "d",
+}
+
+# NOTE (geometry key, layer element, typed index, name, mapping, arrays)
+# reference is IndexToDirect when the index array exists in the geometry
+LAYER_ELEMENTS = (
+    (
+        "normals",
+        "LayerElementNormal",
+        0,
+        "",
+        "ByPolygonVertex",
+        (("Normals", "normals"), ("NormalsIndex", "normals_indices")),
+    ),
+    (
+        "binormals",
+        "LayerElementBinormal",
+        0,
+        "map1",
+        "ByVertice",
+        (("Binormals", "binormals"), ("BinormalsW", "binormalsW")),
+    ),
+    (
+        "tangents",
+        "LayerElementTangent",
+        0,
+        "map1",
+        "ByPolygonVertex",
+        (("Tangents", "tangents"), ("TangentsIndex", "tangents_indices")),
+    ),
+    (
+        "colors",
+        "LayerElementColor",
+        0,
+        "colorSet1",
+        "ByPolygonVertex",
+        (("Colors", "colors"), ("ColorIndex", "colors_indices")),
+    ),
+    (
+        "uvs",
+        "LayerElementUV",
+        0,
+        "map1",
+        "ByPolygonVertex",
+        (("UV", "uvs"), ("UVIndex", "uvs_indices")),
+    ),
+    (
+        "uv2s",
+        "LayerElementUV",
+        1,
+        "map2",
+        "ByPolygonVertex",
+        (("UV", "uv2s"), ("UVIndex", "uv2s_indices")),
+    ),
+)
+
+# NOTE which array property hold integer data
+INDEX_ARRAYS = ("PolygonVertexIndex", "NormalsIndex", "TangentsIndex", "ColorIndex", "UVIndex")
+
+
+def pack_array(code, values, compress=False):
+    if hasattr(values, "astype"):
+        # NOTE numpy array
+        raw = values.astype("<" + ARRAY_FORMAT[code]).tobytes()
+        length = len(values)
+    else:
+        data = array.array(ARRAY_FORMAT[code], values)
+        if sys.byteorder != "little":
+            data.byteswap()
+        raw = data.tobytes()
+        length = len(data)
+    encoding = 0
+    if compress and len(raw) > COMPRESS_THRESHOLD:
+        raw = zlib.compress(raw)
+        encoding = 1
+    return struct.pack("<III", length, encoding, len(raw)) + raw
+
+
+def pack_property(code, value, compress=False):
+    if code in SCALAR_FORMAT:
+        data = struct.pack("<" + SCALAR_FORMAT[code], value)
+    elif code in ("S", "R"):
+        if not isinstance(value, bytes):
+            value = value.encode("utf-8")
+        data = struct.pack("<I", len(value)) + value
+    elif code in ARRAY_FORMAT:
+        data = pack_array(code, value, compress)
+    else:
+        raise ValueError("unknown FBX property type %r" % code)
+    return code.encode("ascii") + data
+
+
+class FBXNode(object):
+    def __init__(self, name, *props, **kwargs):
+        self.name = name
+        self.compress = kwargs.get("compress", False)
+        # NOTE packed while writing, only one packed array live at a time
+        self.props = props
+        self.children = []
+        # NOTE file position once written, see `patch_property`
+        self.offset = None
+
+    def add(self, name, *props):
+        node = FBXNode(name, *props, compress=self.compress)
+        self.children.append(node)
+        return node
+
+    def write(self, f):
+        """stream the node at the current position, the header is patched once the size is known"""
+        name = self.name.encode("ascii")
+        start = self.offset = f.tell()
+        # NOTE EndOffset + NumProperties + PropertyListLen + NameLen
+        f.write(struct.pack("<IIIB", 0, 0, 0, len(name)) + name)
+        props_length = 0
+        for code, value in self.props:
+            data = pack_property(code, value, self.compress)
+            props_length += len(data)
+            f.write(data)
+        for child in self.children:
+            child.write(f)
+        if self.children or not self.props:
+            f.write(NULL_RECORD)
+
+        end = f.tell()
+        f.seek(start)
+        f.write(struct.pack("<III", end, len(self.props), props_length))
+        f.seek(end)
+
+
+def patch_property(f, node, code, value):
+    """overwrite the first scalar property of a node already written, the size must not change"""
+    end = f.tell()
+    # NOTE EndOffset + NumProperties + PropertyListLen + NameLen + name + type code
+    f.seek(node.offset + 13 + len(node.name) + 1)
+    f.write(struct.pack("<" + SCALAR_FORMAT[code], value))
+    f.seek(end)
+
+
+def add_properties70(node, *properties):
+    props = node.add("Properties70")
+    for name, type_name, label, flag, value in properties:
+        props.add("P", ("S", name), ("S", type_name), ("S", label), ("S", flag), value)
+    return props
+
+
+def header_nodes(count, compress=False, creator=None):
+    header = FBXNode("FBXHeaderExtension", compress=compress)
+    header.add("FBXHeaderVersion", ("I", 1003))
+    header.add("FBXVersion", ("I", FBX_VERSION))
+    nodes = [header]
+    if creator:
+        nodes.append(FBXNode("Creator", ("S", creator), compress=compress))
+
+    definitions = FBXNode("Definitions", compress=compress)
+    for object_type, template, prop in (
+        ("Geometry", "FbxMesh", ("Primary Visibility", "bool", "", "", ("I", 1))),
+        ("Model", "FbxNode", ("Visibility", "Visibility", "", "A", ("D", 1.0))),
+    ):
+        node = definitions.add("ObjectType", ("S", object_type))
+        node.add("Count", ("I", count))
+        add_properties70(node.add("PropertyTemplate", ("S", template)), prop)
+
+    return nodes + [definitions]
+
+
+def mesh_nodes(save_name, geometry, geometry_id, model_id, compress=False):
+    """Geometry and Model node of a single mesh"""
+    mesh = FBXNode("Geometry", ("L", geometry_id), ("S", b"\x00\x01Geometry"), ("S", "Mesh"), compress=compress)
+    mesh.add("Vertices", ("d", geometry["vertices"]))
+    mesh.add("PolygonVertexIndex", ("i", geometry["polygons"]))
+    mesh.add("GeometryVersion", ("I", 124))
+
+    layers = {0: [], 1: []}
+    for key, element, index, name, mapping, arrays in LAYER_ELEMENTS:
+        if key not in geometry:
+            continue
+        arrays = [(prop, array_key) for prop, array_key in arrays if array_key in geometry]
+        reference = "IndexToDirect" if "%s_indices" % key in geometry else "Direct"
+        node = mesh.add(element, ("I", index))
+        node.add("Version", ("I", 101))
+        node.add("Name", ("S", name))
+        node.add("MappingInformationType", ("S", mapping))
+        node.add("ReferenceInformationType", ("S", reference))
+        for prop, array_key in arrays:
+            code = "i" if prop in INDEX_ARRAYS else "d"
+            node.add(prop, (code, geometry[array_key]))
+        layers[index].append((element, index))
+
+    for index, elements in sorted(layers.items()):
+        layer = mesh.add("Layer", ("I", index))
+        layer.add("Version", ("I", 100))
+        for element, typed_index in elements:
+            node = layer.add("LayerElement")
+            node.add("Type", ("S", element))
+            node.add("TypedIndex", ("I", typed_index))
+
+    return [mesh, model_node(save_name, model_id, compress)]
+
+
+def model_node(save_name, model_id, compress=False):
+    model_name = save_name.encode("utf-8") + b"\x00\x01Model"
+    model = FBXNode("Model", ("L", model_id), ("S", model_name), ("S", "Mesh"), compress=compress)
+    add_properties70(model, ("DefaultAttributeIndex", "int", "Integer", "", ("I", 0)))
+    return model
+
+
+def write_footer(f):
+    f.write(FOOT_ID)
+    f.write(b"\x00" * 4)
+    # NOTE footer padding align to 16 bytes
+    offset = f.tell()
+    pad = ((offset + 15) & ~15) - offset
+    f.write(b"\x00" * (pad or 16))
+    f.write(struct.pack("<I", FBX_VERSION))
+    f.write(b"\x00" * 120)
+    f.write(FOOT_MAGIC)
+
+
+def write_binary_scene(save_path, meshes, count, compress=False, progress=None, creator=None):
+    """stream every (name, geometry) of `meshes` into one file as a Geometry/Model pair
+
+    `meshes` can be a generator, each mesh is written as soon as it is yielded.
+    a (name, geometry, key) mesh whose key is already written only add a Model of the earlier Geometry.
+    `creator` is written as the file `Creator`, e.g. the content hash.
+    `progress` is called with the mesh being written, it can raise to stop the export.
+    """
+    connections = FBXNode("Connections")
+
+    with open(save_path, "wb") as f:
+        f.write(HEAD_MAGIC)
+        f.write(struct.pack("<I", FBX_VERSION))
+        nodes = header_nodes(count, compress, creator)
+        for node in nodes:
+            node.write(f)
+        # NOTE Definitions > ObjectType Geometry > Count, the instanced meshes share a Geometry
+        geometry_count = nodes[-1].children[0].children[0]
+
+        # NOTE Objects end offset is patched after all the children are written
+        objects_offset = f.tell()
+        f.write(struct.pack("<IIIB", 0, 0, 0, len(b"Objects")) + b"Objects")
+        geometry_ids = {}
+        for index, mesh in enumerate(meshes):
+            name, geometry = mesh[:2]
+            key = mesh[2] if len(mesh) > 2 else index
+            model_id = MODEL_ID + index
+            if key in geometry_ids:
+                # NOTE identical mesh, instance the Geometry already written
+                geometry_id = geometry_ids[key]
+                nodes = [model_node(name, model_id, compress)]
+            else:
+                geometry_id = geometry_ids[key] = GEOMETRY_ID + index
+                nodes = mesh_nodes(name, geometry, geometry_id, model_id, compress)
+            for node in nodes:
+                if progress:
+                    progress("write %s %s" % (node.name, name))
+                node.write(f)
+            connections.add("C", ("S", "OO"), ("L", model_id), ("L", 0))
+            connections.add("C", ("S", "OO"), ("L", geometry_id), ("L", model_id))
+        f.write(NULL_RECORD)
+        end_offset = f.tell()
+        f.seek(objects_offset)
+        f.write(struct.pack("<I", end_offset))
+        f.seek(end_offset)
+
+        connections.write(f)
+        f.write(NULL_RECORD)
+        write_footer(f)
+        patch_property(f, geometry_count, "I", len(geometry_ids))
+
+
+def write_binary(save_path, save_name, geometry, compress=False):
+    write_binary_scene(save_path, [(save_name, geometry)], 1, compress)
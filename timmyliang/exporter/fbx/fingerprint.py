@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+content hash of the decoded mesh
+
+the hash cover the index, the mapped attribute columns and the output options of the mapper,
+it is written as the FBX `Creator` so a re-export can tell the target is already up to date.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import re
+import sys
+import json
+import array
+import hashlib
+from itertools import chain
+
+# NOTE bump when the writers change the output, the old files are then written again
+FINGERPRINT_VERSION = 2
+CREATOR_PREFIX = "renderdoc2fbx sha1:"
+CREATOR_PATTERN = re.compile(re.escape(CREATOR_PREFIX).encode("ascii") + b"([0-9a-f]{40})")
+# NOTE the Creator is written in the first few nodes
+HEAD_SIZE = 65536
+
+# NOTE mapper keys which only change how the export run, not the output
+RUNTIME_KEYS = (
+    "WORKERS",
+    "BATCH_WORKERS",
+    "PYTHON",
+    "BACKGROUND",
+    "HELPER",
+    "CACHE_BUDGET",
+    "CACHE_DISK",
+    "MEMORY_BUDGET",
+    "PROFILE",
+    "PROFILE_MEMORY",
+    "CPROFILE",
+    "FORCE",
+)
+
+
+def column_bytes(values, type_code):
+    """little endian buffer of a column, list of rows, numpy array, spilled or `Mesh` column"""
+    if hasattr(values, "dtype"):
+        return values.astype("<" + type_code).tobytes()
+    if hasattr(values, "flat_values"):
+        # NOTE compact `Mesh` column, hash the per corner values like the row lists
+        flat = values.flat_values()
+    elif hasattr(values, "as_array"):
+        # NOTE hash the mapped file without copy
+        return values.values
+    else:
+        flat = array.array(type_code)
+        if len(values) and isinstance(values[0], (list, tuple)):
+            flat.extend(chain.from_iterable(values))
+        elif isinstance(values, array.array) and values.typecode != type_code:
+            # NOTE `Mesh` index buffer, array only extend from the same type
+            flat.fromlist(values.tolist())
+        else:
+            flat.extend(values)
+    if sys.byteorder != "little":
+        flat.byteswap()
+    return flat.tobytes()
+
+
+def mesh_hash(data, attrs, mapper):
+    """`attrs` are the attribute columns which reach the output"""
+    options = {key: value for key, value in mapper.items() if key not in RUNTIME_KEYS}
+    digest = hashlib.sha1()
+    digest.update(json.dumps([FINGERPRINT_VERSION, options], sort_keys=True, default=str).encode("utf-8"))
+    digest.update(column_bytes(data["IDX"], "q"))
+    for attr in sorted(attrs):
+        digest.update(attr.encode("utf-8"))
+        digest.update(column_bytes(data[attr], "d"))
+    return digest.hexdigest()
+
+
+def creator(content_hash):
+    return CREATOR_PREFIX + content_hash
+
+
+def stored_hash(path):
+    """content hash in the `Creator` of an exported file, None if there is not"""
+    if not os.path.isfile(path):
+        return None
+    with open(path, "rb") as f:
+        match = CREATOR_PATTERN.search(f.read(HEAD_SIZE))
+    return match.group(1).decode("ascii") if match else None
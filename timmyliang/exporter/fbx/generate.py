@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+normal and tangent generation
+
+decode the packed normals of the mapped NORMAL input (octahedral or xy only),
+compute area weighted smooth normals and tangents approximating MikkTSpace when the capture lack them.
+with numpy every step is a whole array operation over the triangles,
+the pure python functions give the same result without it.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import math
+from collections import defaultdict
+
+from . import spill
+from . import profiler
+from . import numpy_engine
+from .remap import dense_remap
+from .topology import UnsupportedMesh
+
+np = numpy_engine.np
+
+# NOTE `NORMAL_ENCODING` of the mapper, `_unorm` inputs are stored in [0, 1]
+NORMAL_ENCODINGS = ("octahedral", "octahedral_unorm", "xy", "xy_unorm")
+# NOTE name of the generated inputs in the completed data
+GENERATED = "%s (generated)"
+
+
+def enabled(mapper):
+    return bool(mapper.get("NORMAL_ENCODING") or mapper.get("GENERATE_NORMALS") or mapper.get("GENERATE_TANGENTS"))
+
+
+def normalize(vectors):
+    """unit rows, the zero rows stay zero"""
+    length = np.sqrt(np.einsum("ij,ij->i", vectors, vectors))
+    length[length == 0] = 1.0
+    return vectors / length[:, None]
+
+
+def dot(a, b):
+    return np.einsum("ij,ij->i", a, b)
+
+
+def decode_normals(rows, encoding):
+    """(corner, 3) unit normals from the packed rows"""
+    if encoding not in NORMAL_ENCODINGS:
+        raise ValueError("unknown normal encoding %s" % encoding)
+    packed = rows[:, :2]
+    if encoding.endswith("_unorm"):
+        packed = packed * 2.0 - 1.0
+    x, y = packed[:, 0], packed[:, 1]
+    if encoding.startswith("xy"):
+        z = np.sqrt(np.clip(1.0 - x * x - y * y, 0.0, None))
+        return normalize(np.stack([x, y, z], axis=1))
+
+    # NOTE unfold the lower hemisphere of the octahedron
+    z = 1.0 - np.abs(x) - np.abs(y)
+    fold = np.clip(-z, 0.0, None)
+    x = x - np.copysign(fold, x)
+    y = y - np.copysign(fold, y)
+    return normalize(np.stack([x, y, z], axis=1))
+
+
+def accumulate(total, vertices, values):
+    """add the (corner, width) `values` to the `total` rows of their `vertices`"""
+    for c in range(values.shape[1]):
+        total[:, c] += np.bincount(vertices, weights=values[:, c], minlength=len(total))
+
+
+def smooth_normals(positions, triangles):
+    """per vertex normals, the face normals weighted by their area"""
+    corners = [triangles[:, k] for k in range(3)]
+    p0, p1, p2 = (positions[vertices] for vertices in corners)
+    # NOTE the cross product length is twice the area, no need to normalize the face normal
+    faces = np.cross(p1 - p0, p2 - p0)
+    normals = np.zeros((len(positions), 3))
+    for vertices in corners:
+        accumulate(normals, vertices, faces)
+    return normalize(normals)
+
+
+def corner_angles(p0, p1, p2):
+    """(triangle, 3) interior angle at every corner"""
+    u01, u12, u20 = normalize(p1 - p0), normalize(p2 - p1), normalize(p0 - p2)
+    cosines = np.stack([-dot(u01, u20), -dot(u12, u01), -dot(u20, u12)], axis=1)
+    return np.arccos(np.clip(cosines, -1.0, 1.0, out=cosines), out=cosines)
+
+
+def tangents(positions, normals, uvs, triangles):
+    """per vertex (x, y, z, w) tangents, w is the bitangent sign
+
+    an approximation of MikkTSpace: like it the face tangent follow the uv orientation of the triangle,
+    it is projected on the vertex normal plane and weighted by the corner angle.
+    unlike it a vertex is never split into tangent groups, a vertex shared by mirrored uv triangles
+    get one averaged tangent, the result only match where the capture already split those vertices.
+    """
+    corners = [triangles[:, k] for k in range(3)]
+    p0, p1, p2 = (positions[vertices] for vertices in corners)
+    t0, t1, t2 = (uvs[vertices] for vertices in corners)
+    e1, e2 = p1 - p0, p2 - p0
+    d1, d2 = t1 - t0, t2 - t0
+    # NOTE only the orientation of the uv area matter, the direction is normalized anyway
+    sign = np.sign(d1[:, 0] * d2[:, 1] - d2[:, 0] * d1[:, 1])[:, None]
+    face_tangents = normalize((e1 * d2[:, 1:2] - e2 * d1[:, 1:2]) * sign)
+    face_bitangents = normalize((e2 * d1[:, 0:1] - e1 * d2[:, 0:1]) * sign)
+    weights = corner_angles(p0, p1, p2)
+
+    vertex_tangents = np.zeros((len(positions), 3))
+    vertex_bitangents = np.zeros((len(positions), 3))
+    for k, vertices in enumerate(corners):
+        n = normals[vertices]
+        # NOTE project on the tangent plane of the corner before summing
+        projected = normalize(face_tangents - n * dot(n, face_tangents)[:, None])
+        accumulate(vertex_tangents, vertices, projected * weights[:, k : k + 1])
+        accumulate(vertex_bitangents, vertices, face_bitangents * weights[:, k : k + 1])
+
+    # NOTE Gram-Schmidt against the vertex normal
+    vertex_tangents = normalize(vertex_tangents - normals * dot(normals, vertex_tangents)[:, None])
+    handedness = dot(np.cross(normals, vertex_tangents), vertex_bitangents)
+    w = np.where(handedness < 0, -1.0, 1.0)
+    return np.concatenate([vertex_tangents, w[:, None]], axis=1)
+
+
+def python_normalize(vector):
+    length = math.sqrt(sum(v * v for v in vector))
+    return [v / length for v in vector] if length > 0 else [0.0] * len(vector)
+
+
+def python_decode_normals(rows, encoding):
+    """`decode_normals` of the per corner rows without numpy"""
+    if encoding not in NORMAL_ENCODINGS:
+        raise ValueError("unknown normal encoding %s" % encoding)
+    unorm = encoding.endswith("_unorm")
+    normals = []
+    for row in rows:
+        x, y = (row[0] * 2.0 - 1.0, row[1] * 2.0 - 1.0) if unorm else (row[0], row[1])
+        if encoding.startswith("xy"):
+            z = math.sqrt(max(1.0 - x * x - y * y, 0.0))
+        else:
+            z = 1.0 - abs(x) - abs(y)
+            fold = max(-z, 0.0)
+            x -= math.copysign(fold, x)
+            y -= math.copysign(fold, y)
+        normals.append(python_normalize((x, y, z)))
+    return normals
+
+
+def python_smooth_normals(positions, triangles):
+    """`smooth_normals` without numpy"""
+    normals = [[0.0, 0.0, 0.0] for _ in positions]
+    for a, b, c in triangles:
+        (ax, ay, az), (bx, by, bz), (cx, cy, cz) = positions[a], positions[b], positions[c]
+        ux, uy, uz = bx - ax, by - ay, bz - az
+        vx, vy, vz = cx - ax, cy - ay, cz - az
+        face = (uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx)
+        for vertex in (a, b, c):
+            normal = normals[vertex]
+            normal[0] += face[0]
+            normal[1] += face[1]
+            normal[2] += face[2]
+    return [python_normalize(normal) for normal in normals]
+
+
+def python_dot(a, b):
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def python_tangents(positions, normals, uvs, triangles):
+    """`tangents` without numpy"""
+    vertex_tangents = [[0.0, 0.0, 0.0] for _ in positions]
+    vertex_bitangents = [[0.0, 0.0, 0.0] for _ in positions]
+    for triangle in triangles:
+        p0, p1, p2 = (positions[vertex] for vertex in triangle)
+        t0, t1, t2 = (uvs[vertex] for vertex in triangle)
+        e1 = [p1[i] - p0[i] for i in range(3)]
+        e2 = [p2[i] - p0[i] for i in range(3)]
+        d1 = (t1[0] - t0[0], t1[1] - t0[1])
+        d2 = (t2[0] - t0[0], t2[1] - t0[1])
+        area = d1[0] * d2[1] - d2[0] * d1[1]
+        sign = (area > 0) - (area < 0)
+        face_tangent = python_normalize([(e1[i] * d2[1] - e2[i] * d1[1]) * sign for i in range(3)])
+        face_bitangent = python_normalize([(e2[i] * d1[0] - e1[i] * d2[0]) * sign for i in range(3)])
+
+        u01, u12, u20 = (
+            python_normalize([b[i] - a[i] for i in range(3)]) for a, b in ((p0, p1), (p1, p2), (p2, p0))
+        )
+        cosines = (-python_dot(u01, u20), -python_dot(u12, u01), -python_dot(u20, u12))
+        for vertex, cosine in zip(triangle, cosines):
+            weight = math.acos(min(max(cosine, -1.0), 1.0))
+            n = normals[vertex]
+            along = python_dot(n, face_tangent)
+            projected = python_normalize([face_tangent[i] - n[i] * along for i in range(3)])
+            tangent, bitangent = vertex_tangents[vertex], vertex_bitangents[vertex]
+            for i in range(3):
+                tangent[i] += projected[i] * weight
+                bitangent[i] += face_bitangent[i] * weight
+
+    result = []
+    for n, tangent, bitangent in zip(normals, vertex_tangents, vertex_bitangents):
+        along = python_dot(n, tangent)
+        tangent = python_normalize([tangent[i] - n[i] * along for i in range(3)])
+        cross = (
+            n[1] * tangent[2] - n[2] * tangent[1],
+            n[2] * tangent[0] - n[0] * tangent[2],
+            n[0] * tangent[1] - n[1] * tangent[0],
+        )
+        result.append(tangent + [-1.0 if python_dot(cross, bitangent) < 0 else 1.0])
+    return result
+
+
+def complete(mapper, data, attr_list, progress=None):
+    """return (mapper, data, attr_list) with the decoded and generated inputs mapped
+
+    the input `data` is not modified, it may be held by the mesh cache.
+    raise `UnsupportedMesh` when the inputs the generation need are not collected.
+    """
+    if not enabled(mapper):
+        return mapper, data, attr_list
+
+    completed = defaultdict(list, {key: data[key] for key in ["IDX"] + sorted(attr_list)})
+    mapper = dict(mapper)
+    attr_list = set(attr_list)
+    # NOTE over the memory budget the generated columns are mapped like the captured ones
+    spilled = spill.is_spilled(data, attr_list)
+    if np is not None:
+        idx_list, first = numpy_engine.dense_remap(np.asarray(data["IDX"], dtype=np.int64))
+        triangles = idx_list.reshape(-1, 3)
+        decode, smooth, tangent_space = decode_normals, smooth_normals, tangents
+    else:
+        idx_list, first = dense_remap(data["IDX"])
+        triangles = list(zip(idx_list[0::3], idx_list[1::3], idx_list[2::3]))
+        decode, smooth, tangent_space = python_decode_normals, python_smooth_normals, python_tangents
+
+    def column(key):
+        """per corner rows, a float64 array with numpy"""
+        attr = mapper.get(key)
+        if attr not in attr_list or not len(completed[attr]):
+            return None
+        return numpy_engine.to_array(completed[attr]) if np is not None else completed[attr]
+
+    def per_vertex(rows, width):
+        if np is not None:
+            return rows[first, :width]
+        return [list(rows[c][:width]) for c in first]
+
+    def add(key, vertex_values):
+        values = vertex_values[idx_list] if np is not None else [vertex_values[v] for v in idx_list]
+        name = GENERATED % key
+        completed[name] = spill.SpillColumn.from_rows(values) if spilled else values
+        attr_list.add(name)
+        mapper[key] = name
+
+    def stage(name):
+        if progress:
+            progress(name)
+        return profiler.stage(name, count=len(triangles))
+
+    vertex_normals = None
+    normals = column("NORMAL")
+    if normals is not None:
+        if mapper.get("NORMAL_ENCODING"):
+            with stage("decode normals"):
+                # NOTE the corners of a vertex share the packed value, decode once per vertex
+                vertex_normals = decode(per_vertex(normals, 2), mapper["NORMAL_ENCODING"])
+                add("NORMAL", vertex_normals)
+        else:
+            vertex_normals = per_vertex(normals, 3)
+
+    generate_normals = vertex_normals is None and mapper.get("GENERATE_NORMALS")
+    generate_tangents = mapper.get("GENERATE_TANGENTS") and column("TANGENT") is None
+    if not generate_normals and not generate_tangents:
+        return mapper, completed, attr_list
+    positions = column("POSITION")
+    if positions is None:
+        raise UnsupportedMesh("normal and tangent generation need the mapped POSITION input")
+    positions = per_vertex(positions, 3)
+
+    if generate_normals:
+        with stage("generate normals"):
+            vertex_normals = smooth(positions, triangles)
+            add("NORMAL", vertex_normals)
+
+    if generate_tangents:
+        uvs = column("UV")
+        if uvs is None:
+            raise UnsupportedMesh("tangent generation need the mapped UV input")
+        if vertex_normals is None:
+            raise UnsupportedMesh("tangent generation need the NORMAL input, map it or tick the normal generation")
+        with stage("generate tangents"):
+            add("TANGENT", tangent_space(positions, vertex_normals, per_vertex(uvs, 2), triangles))
+    return mapper, completed, attr_list
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+glTF 2.0 binary (.glb) writer
+
+the mapped attributes are written per vertex as tightly packed float32 bufferViews,
+the compacted index buffer as uint16 or uint32, no text formatting of the values at all.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import sys
+import json
+import array
+import struct
+
+from . import generate
+from . import numpy_engine
+from .remap import dense_remap
+
+GLB_MAGIC = b"glTF"
+GLB_VERSION = 2
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+GENERATOR = "renderdoc2fbx"
+
+FLOAT = 5126
+UNSIGNED_SHORT = 5123
+UNSIGNED_INT = 5125
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+TRIANGLES = 4
+TYPES = {1: "SCALAR", 2: "VEC2", 3: "VEC3", 4: "VEC4"}
+
+# NOTE (mapper key, glTF semantic, component count, pad value)
+# COLOR keep 3 or 4 components, a zero count keep the input width
+GLTF_ATTRIBUTES = (
+    ("POSITION", "POSITION", 3, 0.0),
+    ("NORMAL", "NORMAL", 3, 0.0),
+    ("TANGENT", "TANGENT", 4, 1.0),
+    ("COLOR", "COLOR_0", 0, 1.0),
+    ("UV", "TEXCOORD_0", 2, 0.0),
+    ("UV2", "TEXCOORD_1", 2, 0.0),
+)
+
+
+def padding(size, align=4):
+    return -size % align
+
+
+def fit_width(rows, width, pad):
+    """python rows cut or padded to `width` components, flatten into float32"""
+    values = array.array("f")
+    for row in rows:
+        row = list(row[:width])
+        values.extend(row + [pad] * (width - len(row)))
+    return values
+
+
+def glb_mesh(mapper, data, attr_list, progress=None):
+    """per vertex attribute arrays and the compacted index buffer of one draw
+
+    glTF and the captured buffers share the top left uv origin, the uv is not flipped like the FBX layers.
+    `progress` is called with the attribute being packed, it can raise to stop the export.
+    """
+    mapper, data, attr_list = generate.complete(mapper, data, attr_list, progress)
+    use_numpy = numpy_engine.np is not None
+    if use_numpy:
+        np = numpy_engine.np
+        indices, first = numpy_engine.dense_remap(np.asarray(data["IDX"], dtype=np.int64))
+    else:
+        indices, first = dense_remap(data["IDX"])
+
+    attributes = []
+    for key, semantic, width, pad in GLTF_ATTRIBUTES:
+        attr = mapper.get(key)
+        if not attr or attr not in attr_list or not len(data[attr]):
+            continue
+        if progress:
+            progress("pack %s" % semantic)
+        rows = data[attr]
+        if not width:
+            width = 4 if len(rows[0]) >= 4 else 3
+
+        if use_numpy:
+            if hasattr(rows, "dtype") or hasattr(rows, "as_array"):
+                rows = numpy_engine.to_array(rows)[first]
+            else:
+                # NOTE only convert the first corner of each vertex
+                rows = numpy_engine.to_array([rows[i] for i in first.tolist()])
+            values = np.full((len(rows), width), pad, dtype="<f4")
+            count = min(width, rows.shape[1])
+            values[:, :count] = rows[:, :count]
+        else:
+            values = fit_width((rows[i] for i in first), width, pad)
+        attributes.append((semantic, values, width))
+
+    vertex_count = len(first)
+    if use_numpy:
+        indices = indices.astype("<u2" if vertex_count <= 0xFFFF else "<u4")
+    else:
+        # NOTE `I` is 32 bits on every platform RenderDoc run
+        indices = array.array("H" if vertex_count <= 0xFFFF else "I", indices)
+    return {"indices": indices, "attributes": attributes, "count": vertex_count}
+
+
+def to_bytes(values):
+    """buffer in little endian, numpy arrays are already typed little endian"""
+    if isinstance(values, array.array) and sys.byteorder != "little":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return memoryview(values).cast("B")
+
+
+def bounds(values, width):
+    if hasattr(values, "dtype"):
+        values = values.reshape(-1, width)
+        return values.min(axis=0).tolist(), values.max(axis=0).tolist()
+    return (
+        [min(values[c::width]) for c in range(width)],
+        [max(values[c::width]) for c in range(width)],
+    )
+
+
+def write_glb_scene(save_path, meshes, progress=None, creator=None):
+    """write every (name, mesh) of `meshes` built by `glb_mesh` as a node of one scene
+
+    a (name, mesh, key) mesh whose key is already written only add a node of the earlier mesh.
+    `creator` is written as the asset generator, e.g. the content hash.
+    """
+    document = {
+        "asset": {"version": "2.0", "generator": creator or GENERATOR},
+        "scene": 0,
+        "scenes": [{"nodes": []}],
+        "nodes": [],
+        "meshes": [],
+        "accessors": [],
+        "bufferViews": [],
+        "buffers": [],
+    }
+    # NOTE (name, offset, buffer) in the bufferView order, the chunk is written after the json
+    views = []
+    offset = 0
+
+    def add_view(name, values, target):
+        nonlocal offset
+        buffer = to_bytes(values)
+        offset += padding(offset)
+        view = {"buffer": 0, "byteOffset": offset, "byteLength": len(buffer), "target": target}
+        document["bufferViews"].append(view)
+        views.append((name, offset, buffer))
+        offset += len(buffer)
+        return len(document["bufferViews"]) - 1
+
+    def add_accessor(accessor):
+        document["accessors"].append(accessor)
+        return len(document["accessors"]) - 1
+
+    mesh_ids = {}
+    for index, mesh in enumerate(meshes):
+        name, primitive = mesh[:2]
+        key = mesh[2] if len(mesh) > 2 else index
+        if key not in mesh_ids:
+            attributes = {}
+            for semantic, values, width in primitive["attributes"]:
+                accessor = {
+                    "bufferView": add_view("%s %s" % (semantic, name), values, ARRAY_BUFFER),
+                    "componentType": FLOAT,
+                    "count": primitive["count"],
+                    "type": TYPES[width],
+                }
+                if semantic == "POSITION":
+                    # NOTE required by the spec for the position accessor
+                    accessor["min"], accessor["max"] = bounds(values, width)
+                attributes[semantic] = add_accessor(accessor)
+
+            indices = primitive["indices"]
+            item_size = getattr(indices, "itemsize", 4)
+            accessor = {
+                "bufferView": add_view("indices %s" % name, indices, ELEMENT_ARRAY_BUFFER),
+                "componentType": UNSIGNED_SHORT if item_size == 2 else UNSIGNED_INT,
+                "count": len(indices),
+                "type": "SCALAR",
+            }
+            primitive = {"attributes": attributes, "indices": add_accessor(accessor), "mode": TRIANGLES}
+            document["meshes"].append({"name": name, "primitives": [primitive]})
+            mesh_ids[key] = len(document["meshes"]) - 1
+
+        # NOTE identical mesh, instance the mesh already written
+        document["nodes"].append({"name": name, "mesh": mesh_ids[key]})
+        document["scenes"][0]["nodes"].append(len(document["nodes"]) - 1)
+
+    offset += padding(offset)
+    document["buffers"].append({"byteLength": offset})
+    if not offset:
+        del document["buffers"], document["bufferViews"]
+
+    content = json.dumps(document, separators=(",", ":")).encode("utf-8")
+    content += b" " * padding(len(content))
+    length = 12 + 8 + len(content) + (8 + offset if offset else 0)
+
+    with open(save_path, "wb") as f:
+        f.write(struct.pack("<4sII", GLB_MAGIC, GLB_VERSION, length))
+        f.write(struct.pack("<II", len(content), CHUNK_JSON))
+        f.write(content)
+        if not offset:
+            return
+        f.write(struct.pack("<II", offset, CHUNK_BIN))
+        position = 0
+        for name, start, buffer in views:
+            if progress:
+                progress("write %s" % name)
+            f.write(b"\x00" * (start - position))
+            f.write(buffer)
+            position = start + len(buffer)
+        f.write(b"\x00" * (offset - position))
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+out of process export helper
+
+the collected columns are packed once as the `.rdmc` layout into a shared memory block
+(a memory mapped temporary file before python 3.8), a system python `parallel.Worker` attach it,
+run the export there and send the progress back over its stdout.
+only the block name and the export options are pickled, never the per vertex values.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import mmap
+import tempfile
+import traceback
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # NOTE python 3.6 of the older RenderDoc
+    shared_memory = None
+
+from . import parallel
+from . import profiler
+from . import mesh_io
+from . import core
+
+# NOTE the exports the helper can run, looked up by name in the helper process
+EXPORTS = ("export_fbx", "export_glb")
+
+
+class SharedBlock(object):
+    """writable block the helper process can attach by `name`"""
+
+    def __init__(self, size):
+        # NOTE zero length can not be mapped
+        size = max(size, mmap.ALLOCATIONGRANULARITY)
+        if shared_memory is not None:
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+            self.kind, self.name, self.buffer = "shm", self.memory.name, self.memory.buf
+            return
+        handle, self.name = tempfile.mkstemp(suffix=".rdmc")
+        os.ftruncate(handle, size)
+        self.memory = mmap.mmap(handle, size)
+        os.close(handle)
+        self.kind, self.buffer = "file", memoryview(self.memory)
+
+    def close(self):
+        self.buffer.release()
+        self.memory.close()
+        if self.kind == "shm":
+            self.memory.unlink()
+        else:
+            os.remove(self.name)
+
+
+def attach(kind, name):
+    """(buffer, close) of the block created by the parent"""
+    if kind == "shm":
+        memory = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            # NOTE the parent own the block, the resource tracker of the helper would unlink it at exit
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(memory._name, "shared_memory")
+        return memory.buf, memory.close
+    with open(name, "rb") as f:
+        memory = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memory, memory.close
+
+
+def helper_main(job, send):
+    """entry of the helper process, every message is a (kind, ...) tuple"""
+    kind, name, save_path, mapper, export = job
+    try:
+        buffer, close = attach(kind, name)
+        try:
+            data, attr_list = mesh_io.unpack_columns(buffer, arrays=True)
+        finally:
+            # NOTE the numpy arrays are copies, release the view before closing
+            del buffer
+            close()
+
+        def progress(step):
+            send(("progress", step))
+
+        with profiler.mapper_session(mapper) as prof:
+            result = getattr(core, export)(save_path, mapper, data, attr_list, None, progress)
+        send(("result", result, prof.records))
+    except Exception:
+        send(("error", traceback.format_exc()))
+
+
+def export_remote(save_path, mapper, data, attr_list, controller, progress=None, export=core.export_fbx):
+    """run `export` in a system python helper process, same signature and result as `export`
+
+    `progress` is called with the steps of the helper, raising in it terminate the helper.
+    """
+    if not data:
+        return
+    if export.__name__ not in EXPORTS:
+        raise ValueError("%s can not run in the helper process" % export.__name__)
+    python = parallel.python_executable(mapper.get("PYTHON"))
+    if not python:
+        raise RuntimeError("no python interpreter found for the helper process")
+
+    with profiler.stage("pack columns", count=len(data["IDX"])):
+        block = SharedBlock(mesh_io.columns_size(data, attr_list))
+        mesh_io.pack_columns(block.buffer, data, attr_list)
+
+    worker = None
+    try:
+        with profiler.stage("helper %s" % export.__name__):
+            # NOTE the helper import the package on its own interpreter, not the RenderDoc `sys.path`
+            worker = parallel.Worker(python, "helper")
+            # NOTE the helper run the export in place, no nested pool
+            worker.send((block.kind, block.name, save_path, dict(mapper, WORKERS=0), export.__name__))
+            while True:
+                message = worker.recv()
+                if message[0] == "progress":
+                    if progress:
+                        progress(message[1])
+                elif message[0] == "error":
+                    raise RuntimeError("export helper fail\n%s" % message[1])
+                else:
+                    _, result, records = message
+                    break
+        prof = profiler.current()
+        if prof is not profiler.NULL:
+            # NOTE the helper stages go under the helper stage in the report
+            depth = len(prof.stack) + 1
+            prof.records.extend(dict(record, depth=record["depth"] + depth) for record in records)
+        return result
+    except Exception:
+        # NOTE cancelled by `progress`, stop the helper where it is
+        if worker is not None and worker.process.poll() is None:
+            worker.terminate()
+            # NOTE a killed helper can not remove the file it was writing aside
+            temp_path = core.aside_path(save_path)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        raise
+    finally:
+        if worker is not None:
+            # NOTE wait the exit before the block is released
+            worker.close()
+        block.close()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+base of the geometry engines
+
+the pure python and the numpy `ProcessHandler` only differ by their `run_` methods,
+each one build a FBX layer into `geometry`.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import time
+import inspect
+
+from . import spill
+from . import profiler
+
+
+class LayerHandler(object):
+    """`spilled` move every built layer out of the heap, the input is over the memory budget
+
+    it is decided once by the caller, the pipelined collection still add attributes while the layers are built.
+    """
+
+    def __init__(self, spilled=False):
+        self.geometry = {}
+        self.spilled = spilled
+
+    def layers(self):
+        return [name for name, _ in inspect.getmembers(self, inspect.isroutine) if name.startswith("run_")]
+
+    def build_layer(self, name):
+        with profiler.stage(name) as record:
+            keys = set(self.geometry)
+            getattr(self, name)()
+            added = set(self.geometry) - keys
+            # NOTE count every value the layer added
+            record["count"] = sum(len(self.geometry[key]) for key in added)
+            if self.spilled:
+                for key in added:
+                    self.geometry[key] = spill.spill_layer(key, self.geometry[key])
+
+    def run(self, progress=None):
+        curr = time.time()
+        for name in self.layers():
+            if progress:
+                progress(name)
+            self.build_layer(name)
+        print("elapsed time template: %s" % (time.time() - curr))
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+two tier cache of the decoded `data`/`attr_list`
+
+- in memory LRU limited by an estimated byte budget
+- optional on disk store of `.rdmc` columns, survive the RenderDoc restart
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import sys
+import json
+import array
+import hashlib
+import tempfile
+from collections import OrderedDict
+
+from .mesh_io import write_columns, read_columns
+
+DEFAULT_BUDGET = 512 * 1024 * 1024
+DEFAULT_DIRECTORY = os.path.join(tempfile.gettempdir(), "renderdoc2fbx_cache")
+
+
+def cache_key(*parts):
+    """hash the capture path, event id, table layout ... into a file name safe key"""
+    text = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def estimate_bytes(data, attr_list):
+    """rough size of the python lists (float and int objects included) or numpy arrays"""
+    size = 0
+    for name, values in data.items():
+        if hasattr(values, "nbytes"):
+            size += values.nbytes
+            continue
+        if isinstance(values, array.array):
+            size += sys.getsizeof(values)
+            continue
+        size += sys.getsizeof(values)
+        if not len(values):
+            continue
+        if name in attr_list:
+            # NOTE every row is a list of float objects
+            size += len(values) * (sys.getsizeof(values[0]) + len(values[0]) * 24)
+        else:
+            size += len(values) * 28
+    return size
+
+
+class MeshCache(object):
+    def __init__(self, budget=DEFAULT_BUDGET, directory=None):
+        self.budget = budget
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.total = 0
+
+    def configure(self, budget=None, directory=None):
+        """`directory` None turn the disk tier off"""
+        if budget is not None:
+            self.budget = budget
+        self.directory = directory
+        self.evict()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".rdmc")
+
+    def get(self, key, attrs=()):
+        """return (data, attr_list), None on miss
+
+        `attrs` are the attributes the caller need, an entry collected with fewer of them is a miss.
+        """
+        if key in self.entries:
+            data, attr_list, _ = self.entries[key]
+            if not set(attrs) <= attr_list:
+                return None
+            self.entries.move_to_end(key)
+            return data, attr_list
+
+        if self.directory and os.path.isfile(self.path(key)):
+            # NOTE the attributes come back as numpy arrays, no per row python lists
+            data, attr_list = read_columns(self.path(key), arrays=True)
+            if not set(attrs) <= attr_list:
+                return None
+            self.remember(key, data, attr_list)
+            return data, attr_list
+        return None
+
+    def put(self, key, data, attr_list):
+        self.remember(key, data, attr_list)
+        if not self.directory:
+            return
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            # NOTE write aside then rename, a broken export never leave a truncated entry
+            temp_path = self.path(key) + ".tmp"
+            write_columns(temp_path, data, attr_list)
+            os.replace(temp_path, self.path(key))
+        except (IOError, OSError, TypeError, ValueError, OverflowError):
+            import traceback
+
+            # NOTE the disk tier is optional, keep export going
+            traceback.print_exc()
+
+    def remember(self, key, data, attr_list):
+        size = estimate_bytes(data, attr_list)
+        if key in self.entries:
+            self.total -= self.entries.pop(key)[2]
+        # NOTE a mesh larger than the whole budget is only kept on disk
+        if size > self.budget:
+            return
+        self.entries[key] = (data, attr_list, size)
+        self.total += size
+        self.evict()
+
+    def evict(self):
+        while self.total > self.budget and self.entries:
+            _, (_, _, size) = self.entries.popitem(last=False)
+            self.total -= size
+
+    def clear(self):
+        self.entries.clear()
+        self.total = 0
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+compact vertex data without numpy
+
+every attribute keep one `array` row per vertex plus the shared corner to vertex table,
+instead of a python float list per corner, about an order of magnitude smaller.
+the `Mesh` behave like the `data` dict of the table scrape so the export code read it unchanged.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import array
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def index_array(indices):
+    """32 bits unsigned index buffer, 64 bits signed when a negative base vertex push it out of range"""
+    if not len(indices) or (min(indices) >= 0 and max(indices) <= 0xFFFFFFFF):
+        return array.array("I", indices)
+    return array.array("q", indices)
+
+
+class AttributeColumn(object):
+    """per corner rows of one attribute backed by per vertex values
+
+    behave like the list of per row lists scraped from the table,
+    `as_array` return the per corner float64 numpy array for the vectorized engine.
+    """
+
+    __slots__ = ("values", "width", "corners")
+
+    def __init__(self, values, width, corners):
+        self.values = values
+        self.width = width
+        self.corners = corners
+
+    @property
+    def nbytes(self):
+        return self.values.itemsize * len(self.values)
+
+    @property
+    def vertex_count(self):
+        return len(self.values) // self.width if self.width else 0
+
+    def vertex(self, index):
+        """components of the vertex `index`, not the corner"""
+        return self.values[index * self.width : (index + 1) * self.width].tolist()
+
+    def __len__(self):
+        return len(self.corners)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.vertex(vertex) for vertex in self.corners[index]]
+        return self.vertex(self.corners[index])
+
+    def __iter__(self):
+        values, width = self.values, self.width
+        for vertex in self.corners:
+            yield values[vertex * width : (vertex + 1) * width].tolist()
+
+    def flat_values(self):
+        """per corner components as float64, the same buffer as the flatten row lists"""
+        values, width = self.values, self.width
+        return array.array("d", chain.from_iterable(values[v * width : (v + 1) * width] for v in self.corners))
+
+    def as_array(self):
+        table = np.frombuffer(self.values, dtype=self.values.typecode).reshape(-1, self.width)
+        corners = np.frombuffer(self.corners, dtype=self.corners.typecode)
+        return table.astype(np.float64)[corners]
+
+
+class Mesh(object):
+    """index buffer and vertex inputs of one draw
+
+    `mesh["IDX"]` is the index buffer, `mesh[attr]` the `AttributeColumn` of a vertex input,
+    missing keys read as empty like the `defaultdict(list)` of the table scrape.
+    """
+
+    __slots__ = ("indices", "corners", "columns")
+
+    def __init__(self, indices, corners=None):
+        """`corners` map every corner to a vertex row, the index minus the lowest one by default"""
+        self.indices = index_array(indices)
+        if corners is None:
+            base = min(self.indices) if len(self.indices) else 0
+            corners = [idx - base for idx in self.indices]
+        self.corners = array.array("I", corners)
+        self.columns = {}
+
+    def add(self, name, values, width):
+        """`values` is a flat `array` of `width` components per vertex row"""
+        column = AttributeColumn(values, width, self.corners)
+        self.columns[name] = column
+        return column
+
+    @property
+    def index_count(self):
+        return len(self.indices)
+
+    @property
+    def vertex_count(self):
+        return max(self.corners) + 1 if len(self.corners) else 0
+
+    def components(self, name):
+        return self.columns[name].width if name in self.columns else 0
+
+    def __getitem__(self, key):
+        if key == "IDX":
+            return self.indices
+        return self.columns.get(key, [])
+
+    def __setitem__(self, key, value):
+        if key == "IDX":
+            # NOTE the columns share the corner table derived from the indices, build a new `Mesh` instead
+            raise TypeError("the IDX of a Mesh can not be replaced")
+        self.columns[key] = value
+
+    def __contains__(self, key):
+        return key == "IDX" or key in self.columns
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.columns) + 1
+
+    def __bool__(self):
+        # NOTE false without any index like an empty `data`, `len` always count the IDX key
+        return bool(len(self.indices))
+
+    __nonzero__ = __bool__
+
+    def keys(self):
+        return ["IDX"] + list(self.columns)
+
+    def items(self):
+        return [("IDX", self.indices)] + list(self.columns.items())
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
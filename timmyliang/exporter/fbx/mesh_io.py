@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+vertex dump reader and writer
+
+- csv exported from the RenderDoc Mesh Viewer
+- `.rdmc` columnar binary, a json header plus one raw little endian column per attribute
+
+both return the same `data`/`attr_list` structure scraped from the `vsinData` table.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import io
+import csv
+import sys
+import json
+import array
+import struct
+from itertools import chain
+from collections import defaultdict, OrderedDict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+COLUMNS_MAGIC = b"RDMC"
+COLUMNS_VERSION = 1
+# NOTE every column start at a multiple of this
+COLUMNS_ALIGN = 8
+
+
+def read_csv(path):
+    data = defaultdict(list)
+    attr_list = set()
+
+    with io.open(path, "r", newline="") as f:
+        reader = csv.reader(f)
+        header = [head.strip() for head in next(reader)]
+
+        plains = []
+        groups = OrderedDict()
+        for c, head in enumerate(header):
+            if "." not in head:
+                plains.append((head, c))
+            else:
+                attr = head.split(".")[0]
+                groups.setdefault(attr, []).append(c)
+        attr_list.update(groups)
+
+        for row in reader:
+            if not row:
+                continue
+            for head, c in plains:
+                data[head].append(int(row[c]))
+            for attr, columns in groups.items():
+                data[attr].append([float(row[c]) for c in columns])
+
+    return data, attr_list
+
+
+def align(offset):
+    return (offset + COLUMNS_ALIGN - 1) // COLUMNS_ALIGN * COLUMNS_ALIGN
+
+
+def pack_column(values, type_code):
+    column = array.array(type_code, values)
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column.tobytes()
+
+
+def index_type(values):
+    """`I` when every index fit 32 bits unsigned, `q` otherwise (e.g. a negative base vertex)
+
+    the type is stored in the column header, older files with `i` columns are still read.
+    """
+    if getattr(values, "typecode", None) in ("B", "H", "I"):
+        return "I"
+    if not len(values):
+        return "I"
+    if hasattr(values, "dtype"):
+        low, high = values.min(), values.max()
+    else:
+        low, high = min(values), max(values)
+    return "I" if 0 <= low and high < 2 ** 32 else "q"
+
+
+def column_blob(values, type_code):
+    """flatten one column into little endian bytes, aligned"""
+    if hasattr(values, "dtype"):
+        # NOTE numpy rows from the table scrape
+        blob = values.astype("<" + type_code).tobytes()
+    elif hasattr(values, "flat_values"):
+        # NOTE compact `Mesh` column, expand the per vertex values to every corner
+        blob = pack_column(values.flat_values(), type_code)
+    elif len(values) and isinstance(values[0], (list, tuple)):
+        blob = pack_column(chain.from_iterable(values), type_code)
+    else:
+        blob = pack_column(values, type_code)
+    return blob + b"\x00" * (align(len(blob)) - len(blob))
+
+
+def columns_layout(data, attr_list, float_type="d"):
+    """the `.rdmc` header bytes and (name, type) of every column, the size is known before any packing"""
+    columns = []
+    offset = 0
+    rows = len(data["IDX"])
+    for name in sorted(data):
+        values = data[name]
+        if name in attr_list:
+            width = len(values[0]) if rows else 0
+            type_code = float_type
+        else:
+            width = 1
+            type_code = index_type(values)
+
+        columns.append(
+            {
+                "name": name,
+                "type": type_code,
+                "width": width,
+                "offset": offset,
+                "attribute": name in attr_list,
+            }
+        )
+        offset += align(array.array(type_code).itemsize * width * rows)
+
+    header = json.dumps({"rows": rows, "columns": columns}).encode("utf-8")
+    header += b" " * (align(len(header) + 12) - len(header) - 12)
+    header = COLUMNS_MAGIC + struct.pack("<II", COLUMNS_VERSION, len(header)) + header
+    return header, offset, [(column["name"], column["type"]) for column in columns]
+
+
+def write_columns(path, data, attr_list, float_type="d"):
+    """write the mesh data as `.rdmc` columnar binary"""
+    header, _, columns = columns_layout(data, attr_list, float_type)
+    with open(path, "wb") as f:
+        f.write(header)
+        for name, type_code in columns:
+            f.write(column_blob(data[name], type_code))
+
+
+def pack_columns(buffer, data, attr_list, float_type="d"):
+    """write the `.rdmc` layout into a writable buffer of `columns_size` bytes, e.g. shared memory"""
+    header, _, columns = columns_layout(data, attr_list, float_type)
+    buffer[: len(header)] = header
+    offset = len(header)
+    for name, type_code in columns:
+        # NOTE one column in flight, the block is the only full copy
+        blob = column_blob(data[name], type_code)
+        buffer[offset : offset + len(blob)] = blob
+        offset += len(blob)
+    return offset
+
+
+def columns_size(data, attr_list, float_type="d"):
+    header, size, _ = columns_layout(data, attr_list, float_type)
+    return len(header) + size
+
+
+def read_columns_header(buffer):
+    if bytes(buffer[:4]) != COLUMNS_MAGIC:
+        raise ValueError("not a rdmc columnar file")
+    version, size = struct.unpack_from("<II", buffer, 4)
+    if version != COLUMNS_VERSION:
+        raise ValueError("unsupported rdmc version %s" % version)
+    header = json.loads(bytes(buffer[12 : 12 + size]).decode("utf-8"))
+    return header, 12 + size
+
+
+def unpack_columns(buffer, arrays=False):
+    """decode a `.rdmc` buffer, it can be bytes, mmap or shared memory
+
+    `arrays` return the attributes as float64 numpy arrays (copied out of the buffer) when numpy is available.
+    """
+    header, start = read_columns_header(buffer)
+    rows = header["rows"]
+    data = defaultdict(list)
+    attr_list = set()
+    for column in header["columns"]:
+        width = column["width"]
+        name = column["name"]
+        offset = start + column["offset"]
+        if arrays and np is not None and column["attribute"]:
+            attr_list.add(name)
+            dtype = np.dtype(column["type"]).newbyteorder("<")
+            values = np.frombuffer(buffer, dtype=dtype, count=width * rows, offset=offset)
+            data[name] = values.astype(np.float64).reshape(rows, width)
+            continue
+
+        values = array.array(column["type"])
+        values.frombytes(bytes(buffer[offset : offset + values.itemsize * width * rows]))
+        if sys.byteorder != "little":
+            values.byteswap()
+        values = values.tolist()
+
+        if column["attribute"]:
+            attr_list.add(name)
+            data[name] = [values[r * width : r * width + width] for r in range(rows)]
+        else:
+            data[name] = values
+
+    return data, attr_list
+
+
+def read_columns(path, arrays=False):
+    """`arrays` like `unpack_columns`, skip building the per row lists"""
+    with open(path, "rb") as f:
+        return unpack_columns(f.read(), arrays)
+
+
+def read_mesh(path):
+    if path.lower().endswith(".csv"):
+        return read_csv(path)
+    return read_columns(path)
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+NumPy vectorized geometry engine
+
+same output as the `ProcessHandler` in `export_fbx`,
+every attribute keep as a contiguous float64 array and transform as a whole.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+from itertools import chain
+
+from . import spill
+from . import profiler
+from .remap import MAX_SPAN_RATIO
+from .layer_handler import LayerHandler
+
+try:
+    import numpy as np
+except ImportError:
+    # NOTE RenderDoc embedded python may not ship numpy
+    np = None
+
+
+def to_array(rows):
+    """convert per corner value lists into a (corner, component) float64 array"""
+    if hasattr(rows, "dtype"):
+        return np.ascontiguousarray(rows, dtype=np.float64)
+    if hasattr(rows, "as_array"):
+        # NOTE spilled column, view the mapped file without copy
+        return rows.as_array()
+    # NOTE fromiter on the flatten values is much faster than np.array on nested lists
+    width = len(rows[0])
+    values = np.fromiter(chain.from_iterable(rows), dtype=np.float64, count=len(rows) * width)
+    return values.reshape(len(rows), width)
+
+
+def parse_columns(columns, row_count):
+    """parse the component columns (number or display string) into a (row, component) float64 array"""
+    rows = np.empty((row_count, len(columns)), dtype=np.float64)
+    for c, values in enumerate(columns):
+        # NOTE numpy convert the whole column in C, strings included
+        rows[:, c] = values
+    return rows
+
+
+def dedup_rows(rows, quantize=None):
+    """vectorized `dedup_values`, the table keep the first occurrence order"""
+    if quantize is not None:
+        rows = np.round(rows, quantize)
+    # NOTE add zero turn -0.0 into 0.0 so the bytes compare equal
+    rows = np.ascontiguousarray(rows) + 0.0
+    view = rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))).ravel()
+    _, first, inverse = np.unique(view, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+    return rows[first[order]].ravel(), remap[inverse.ravel()]
+
+
+def dense_remap(idx):
+    """vectorized `remap.dense_remap`, return the compacted index and the first corner of every vertex"""
+    if not len(idx):
+        return idx, idx
+    low = idx.min()
+    span = int(idx.max() - low) + 1
+    if span > MAX_SPAN_RATIO * len(idx):
+        # NOTE sparse index, sort the used ones
+        _, first, inverse = np.unique(idx, return_index=True, return_inverse=True)
+        return inverse.ravel(), first
+
+    offset = idx - low
+    used = np.zeros(span, dtype=bool)
+    used[offset] = True
+    table = np.cumsum(used) - 1
+    remapped = table[offset]
+    first = np.full(int(table[-1]) + 1, len(idx), dtype=np.int64)
+    # NOTE repeated fancy assignment has no defined winner, take the minimum corner explicitly
+    np.minimum.at(first, remapped, np.arange(len(idx)))
+    return remapped, first
+
+
+class ProcessHandler(LayerHandler):
+    def __init__(self, mapper, data, attr_list, spilled=None):
+        """`spilled` None check the columns of `data` now, the pipelined collection pass it"""
+        super(ProcessHandler, self).__init__(spill.is_spilled(data, attr_list) if spilled is None else spilled)
+        self.mapper = mapper
+        self.data = data
+        self.attr_list = attr_list
+        self.columns = {}
+        self.quantize = mapper.get("QUANTIZE")
+
+        idx = np.asarray(data["IDX"], dtype=np.int64)
+        # NOTE compacted index and the first corner of every vertex, shared by all the layers
+        self.idx_list, self.first = dense_remap(idx)
+        self.idx_len = len(idx)
+
+    def column(self, key, unique=False):
+        """per corner attribute array, per vertex if `unique`, None if not mapped"""
+        attr = self.mapper.get(key)
+        if attr not in self.attr_list or not len(self.data[attr]):
+            return None
+        if attr in self.columns:
+            values = self.columns[attr]
+            return values[self.first] if unique else values
+
+        rows = self.data[attr]
+        if not unique:
+            self.columns[attr] = to_array(rows)
+            return self.columns[attr]
+        # NOTE only convert the first corner of each vertex
+        if hasattr(rows, "dtype") or hasattr(rows, "as_array"):
+            return to_array(rows)[self.first]
+        return to_array([rows[i] for i in self.first.tolist()])
+
+    def run_vertices(self):
+        positions = self.column("POSITION", unique=True)
+        if positions is None:
+            self.geometry["vertices"] = np.zeros(0)
+            return
+        self.geometry["vertices"] = positions[:, :3].ravel()
+
+    def run_polygons(self):
+        polygons = self.idx_list.copy()
+        polygons[2::3] ^= -1
+        self.geometry["polygons"] = polygons
+
+    def run_normals(self):
+        normals = self.column("NORMAL")
+        if normals is None:
+            return
+        if self.mapper.get("DEDUP"):
+            self.geometry["normals"], self.geometry["normals_indices"] = dedup_rows(normals[:, :3], self.quantize)
+        else:
+            self.geometry["normals"] = normals[:, :3].ravel()
+
+    def run_binormals(self):
+        binormals = self.column("BINORMAL")
+        if binormals is None:
+            return
+        self.geometry["binormals"] = -binormals[:, :3].ravel()
+        self.geometry["binormalsW"] = np.ones(self.idx_len, dtype=np.int64)
+
+    def run_tangents(self):
+        tangents = self.column("TANGENT")
+        if tangents is None:
+            return
+        if self.mapper.get("DEDUP"):
+            self.geometry["tangents"], self.geometry["tangents_indices"] = dedup_rows(tangents[:, :3], self.quantize)
+        else:
+            self.geometry["tangents"] = tangents[:, :3].ravel()
+
+    def run_color(self):
+        colors = self.column("COLOR")
+        if colors is None:
+            return
+        if self.mapper.get("DEDUP"):
+            self.geometry["colors"], self.geometry["colors_indices"] = dedup_rows(colors, self.quantize)
+        else:
+            self.geometry["colors"] = colors.ravel()
+            self.geometry["colors_indices"] = np.arange(self.idx_len)
+
+    def flip_uv(self, uvs):
+        # NOTE flip y axis
+        uvs[:, 1:] = 1 - uvs[:, 1:]
+        return uvs.ravel()
+
+    def run_uv(self):
+        uvs = self.column("UV", unique=True)
+        if uvs is None:
+            return
+        self.geometry["uvs"] = self.flip_uv(uvs)
+        self.geometry["uvs_indices"] = self.idx_list
+
+    def run_uv2(self):
+        uvs = self.column("UV2", unique=True)
+        if uvs is None:
+            return
+        self.geometry["uv2s"] = self.flip_uv(uvs)
+        self.geometry["uv2s_indices"] = self.idx_list
+
+
+def build_geometry(mapper, data, attr_list, progress=None):
+    handler = ProcessHandler(mapper, data, attr_list)
+    with profiler.stage("geometry", count=handler.idx_len):
+        handler.run(progress)
+    return handler.geometry
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+worker processes of the parallel encoding, the batch export and the export helper
+
+qrenderdoc embedded python can not spawn itself and its `sys.path` does not suit another interpreter,
+the workers run `worker.py` on a system python with only the package root added to its own `sys.path`,
+the tasks and the results are pickled over their stdin/stdout.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import sys
+import pickle
+import shutil
+import subprocess
+from collections import deque
+
+# NOTE protocol 4 is read by every python 3 the parent and the workers may run
+PROTOCOL = 4
+# NOTE `exporter.fbx`, the workers run `exporter.fbx.worker`
+PACKAGE = __name__.rpartition(".")[0]
+# NOTE the directory the top level package is imported from
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), *[os.pardir] * (PACKAGE.count(".") + 1)))
+# NOTE seconds a worker get to exit once its stdin is closed
+EXIT_TIMEOUT = 10
+
+
+def python_executable(python=None):
+    """find a python interpreter the workers can run on"""
+    if python and os.path.isfile(python):
+        return python
+    name = os.path.basename(sys.executable).lower()
+    if name.startswith("python"):
+        return sys.executable
+    return shutil.which("python3") or shutil.which("python")
+
+
+def worker_environment():
+    """the parent environment without its python setup, the worker keep the site-packages of its interpreter"""
+    env = dict(os.environ)
+    env.pop("PYTHONHOME", None)
+    env["PYTHONPATH"] = ROOT
+    return env
+
+
+class Worker(object):
+    """system python running `worker.py` in `mode`, exchange pickled messages over its stdin/stdout"""
+
+    def __init__(self, python, mode):
+        self.process = subprocess.Popen(
+            [python, "-m", PACKAGE + ".worker", mode],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=worker_environment(),
+            # NOTE no console window popping up from qrenderdoc
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+        )
+
+    def send(self, message):
+        try:
+            pickle.dump(message, self.process.stdin, PROTOCOL)
+            self.process.stdin.flush()
+        except (OSError, ValueError):
+            raise RuntimeError("worker exit with code %s" % self.wait())
+
+    def recv(self):
+        try:
+            return pickle.load(self.process.stdout)
+        except EOFError:
+            raise RuntimeError("worker exit with code %s" % self.wait())
+
+    def wait(self):
+        """exit code, the worker is killed once the timeout is over"""
+        try:
+            return self.process.wait(EXIT_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            return self.process.wait()
+
+    def close(self):
+        """stdin end of file stop the worker"""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            # NOTE the worker is already gone with unread input
+            pass
+        self.wait()
+        self.process.stdout.close()
+
+    def terminate(self):
+        self.process.kill()
+        self.close()
+
+
+class AsyncResult(object):
+    def __init__(self, pool):
+        self.pool = pool
+        self.message = None
+
+    def get(self):
+        while self.message is None:
+            self.pool.collect()
+        if self.message[0] == "error":
+            _, error, text = self.message
+            error.__cause__ = RuntimeError("worker traceback\n%s" % text)
+            raise error
+        return self.message[1]
+
+
+class WorkerPool(object):
+    """fixed set of `Worker`, the results are read in the order the tasks are sent"""
+
+    def __init__(self, workers, python):
+        self.workers = [Worker(python, "pool") for _ in range(workers)]
+        self.idle = list(self.workers)
+        self.queued = deque()
+        self.running = deque()
+
+    def apply_async(self, func, args=()):
+        result = AsyncResult(self)
+        self.queued.append((result, func, args))
+        self.dispatch()
+        return result
+
+    def dispatch(self):
+        # NOTE only an idle worker get a task, a busy one may block on writing its result
+        while self.idle and self.queued:
+            result, func, args = self.queued.popleft()
+            worker = self.idle.pop()
+            self.running.append((worker, result))
+            worker.send((func, args))
+
+    def collect(self):
+        """wait the oldest running task"""
+        worker, result = self.running.popleft()
+        result.message = worker.recv()
+        self.idle.append(worker)
+        self.dispatch()
+
+    def close(self):
+        # NOTE the results still running are never read, e.g. the export is cancelled
+        busy = set(worker for worker, _ in self.running)
+        for worker in self.workers:
+            if worker in busy:
+                worker.terminate()
+            else:
+                worker.close()
+
+
+def create_pool(workers, python=None):
+    """return a `WorkerPool`, None if parallel mode is off or unavailable"""
+    if not workers or workers < 2:
+        return None
+    python = python_executable(python)
+    if not python:
+        print("no python interpreter found for the workers, encode serially")
+        return None
+    return WorkerPool(workers, python)
+
+
+def close_pool(pool):
+    if pool is not None:
+        pool.close()
+
+
+def imap(pool, func, iterable, window=16):
+    """ordered map, keep at most `window` tasks in flight so memory stay bounded"""
+    if pool is None:
+        for item in iterable:
+            yield func(item)
+        return
+
+    pending = deque()
+    for item in iterable:
+        pending.append(pool.apply_async(func, (item,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
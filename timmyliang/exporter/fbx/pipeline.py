@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+pipelined table collection
+
+the Mesh Viewer table is read attribute by attribute on the UI thread,
+every parsed attribute is queued to a worker thread which build its FBX layers right away,
+the export wait for the slowest stage instead of the sum of collect, rearrange and geometry.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import sys
+import time
+import queue
+import threading
+from collections import OrderedDict, defaultdict
+
+from . import profiler
+from .core import ATTRIBUTE_KEYS, plain_loop, mapped_attributes, engine_handler
+from .core import table_mesh, rearrange_attribute
+from .topology import triangle_corners, take
+
+# NOTE the layer built from each mapper key, `run_polygons` only need the index buffer
+LAYERS = {
+    "POSITION": ("run_vertices",),
+    "NORMAL": ("run_normals",),
+    "BINORMAL": ("run_binormals",),
+    "TANGENT": ("run_tangents",),
+    "COLOR": ("run_color",),
+    "UV": ("run_uv",),
+    "UV2": ("run_uv2",),
+}
+INDEX_LAYERS = ("run_polygons",)
+
+
+class LayerEncoder(object):
+    """build the layers of the queued attributes on a worker thread
+
+    `data` and `attr_list` are filled by the caller, an attribute is `put` once it is parsed.
+    """
+
+    def __init__(self, mapper, data, attr_list, spilled=False):
+        self.mapper = mapper
+        self.data = data
+        self.attr_list = attr_list
+        # NOTE decided before the collection, `attr_list` is still filled while the layers are built
+        self.spilled = spilled
+        self.queue = queue.Queue()
+        self.handler = None
+        self.done = set()
+        self.error = None
+        self.thread = threading.Thread(target=self.work, name="fbx layer encoder")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def layers(self, attr):
+        names = []
+        for key in ATTRIBUTE_KEYS:
+            if self.mapper.get(key) == attr:
+                names.extend(LAYERS.get(key, ()))
+        return names
+
+    def run(self, names):
+        for name in names:
+            if name not in self.done:
+                self.done.add(name)
+                self.handler.build_layer(name)
+
+    def work(self):
+        try:
+            with profiler.stage("encode layers", count=len(self.data["IDX"])):
+                # NOTE the index buffer is collected before the thread start
+                self.handler = engine_handler(self.mapper, self.data, self.attr_list, self.spilled)
+                self.run(INDEX_LAYERS)
+                while True:
+                    attr = self.queue.get()
+                    if attr is None:
+                        break
+                    self.run(self.layers(attr))
+        except Exception:
+            self.error = sys.exc_info()
+
+    def put(self, attr):
+        self.queue.put(attr)
+
+    def finish(self):
+        """wait for the queued layers, build the rest (e.g. the empty vertices) and return the geometry"""
+        self.queue.put(None)
+        self.thread.join()
+        if self.error:
+            raise self.error[1].with_traceback(self.error[2])
+        self.run(self.handler.layers())
+        return self.handler.geometry
+
+
+def collect_encode(model, orientation, mapper, loop=plain_loop, spilled=False, topology="TriangleList", restart=None):
+    """read the table like `collect_model_data` + `rearrange_model_data` and build the geometry meanwhile
+
+    return (data, attr_list, geometry), `data` is the same as the two pass collection followed by `triangulate`.
+    """
+    curr = time.time()
+    rows = range(model.rowCount())
+    attrs = mapped_attributes(mapper)
+    data = defaultdict(list)
+    attr_list = set()
+
+    # NOTE the plain columns like `IDX` first, the component columns grouped by vertex input
+    groups = OrderedDict()
+    for c in range(model.columnCount()):
+        head = model.headerData(c, orientation)
+        if "." not in head:
+            data[head] = [model.data(model.index(r, c)) for r in rows]
+        elif head.split(".")[0] in attrs:
+            groups.setdefault(head.split(".")[0], []).append(c)
+
+    # NOTE strips and fans become a triangle list, every column keep the rows of the source corners
+    source = triangle_corners(data["IDX"], topology, restart)
+    if source is not None:
+        for head in list(data):
+            data[head] = take(data[head], source)
+
+    mesh, first = table_mesh(data["IDX"], spilled)
+    encoder = LayerEncoder(mapper, data if mesh is None else mesh, attr_list, spilled)
+    try:
+        for _, (attr, columns) in loop(list(groups.items()), status="Collect Mesh Data"):
+            values_list = [[model.data(model.index(r, c)) for r in rows] for c in columns]
+            if source is not None:
+                values_list = [take(values, source) for values in values_list]
+            rearrange_attribute(data, mesh, first, attr, values_list, len(data["IDX"]), spilled)
+            attr_list.add(attr)
+            encoder.put(attr)
+    finally:
+        geometry = encoder.finish()
+    print("elapsed time pipeline: %s" % (time.time() - curr))
+    return (data if mesh is None else mesh), attr_list, geometry
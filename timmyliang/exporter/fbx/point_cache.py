@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+delta encoded vertex animation cache `.rdpc`
+
+the topology is exported once as FBX, the per vertex positions (and normals) of every frame
+are stored next to it as the vertices which moved since the previous frame.
+the vertex order is the FBX control point order.
+
+layout (little endian)::
+
+    "RDPC" version vertex_count frame_count header_size   5 x uint32
+    json header                                            {"attributes": [[name, width]], "tolerance": t}
+    per frame: event_id uint32
+        per attribute: moved uint32, moved x uint32 vertex, moved x width x float32 delta
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import sys
+import json
+import array
+import struct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CACHE_MAGIC = b"RDPC"
+CACHE_VERSION = 1
+CACHE_EXTENSION = ".rdpc"
+HEADER = struct.Struct("<4sIIII")
+# NOTE offset of the frame count in the header, patched on close
+FRAME_COUNT_OFFSET = 12
+
+
+def pack(values):
+    if sys.byteorder != "little":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def vertex_values(rows, first, width):
+    """`width` components of the first corner of every vertex, flatten"""
+    if np is not None:
+        if hasattr(rows, "dtype") or hasattr(rows, "as_array"):
+            table = rows if hasattr(rows, "dtype") else rows.as_array()
+            return np.ascontiguousarray(table[np.asarray(first), :width], dtype=np.float64).ravel()
+        return np.array([rows[c][:width] for c in first], dtype=np.float64).ravel()
+    values = []
+    for c in first:
+        values.extend(rows[c][:width])
+    return values
+
+
+def encode_delta(previous, current, width, tolerance=0.0):
+    """moved vertices and their float32 delta, `previous` is updated to the decoded frame
+
+    the frame is rounded to float32 first, the delta is taken against the decoded previous frame
+    so the float32 error never accumulate.
+    """
+    if np is not None:
+        reference = np.frombuffer(previous, dtype=np.float32).reshape(-1, width)
+        current = np.asarray(current, dtype=np.float32).reshape(-1, width).astype(np.float64)
+        delta = (current - reference).astype(np.float32)
+        moved = np.flatnonzero(np.abs(delta).max(axis=1) > tolerance) if len(delta) else np.zeros(0, np.int64)
+        delta = delta[moved]
+        # NOTE numpy view write back into the `array` buffer
+        reference[moved] = (reference[moved].astype(np.float64) + delta).astype(np.float32)
+        return array.array("I", moved.astype(np.uint32).tobytes()), array.array("f", delta.tobytes())
+
+    indices = array.array("I")
+    deltas = array.array("f")
+    current = array.array("f", current)
+    for vertex in range(len(previous) // width):
+        start = vertex * width
+        delta = array.array("f", [current[start + k] - previous[start + k] for k in range(width)])
+        if max(abs(v) for v in delta) <= tolerance:
+            continue
+        indices.append(vertex)
+        deltas.extend(delta)
+        for k in range(width):
+            previous[start + k] = previous[start + k] + delta[k]
+    return indices, deltas
+
+
+def same_topology(corners, other):
+    if np is not None and hasattr(corners, "dtype"):
+        return np.array_equal(corners, other)
+    return list(corners) == list(other)
+
+
+class PointCacheWriter(object):
+    """stream the frames into `path`, the first frame is stored against zero as a key frame"""
+
+    def __init__(self, path, vertex_count, attributes, tolerance=0.0):
+        """`attributes` is a list of (name, width)"""
+        self.path = path
+        self.vertex_count = vertex_count
+        self.attributes = attributes
+        self.tolerance = tolerance
+        self.frame_count = 0
+        self.previous = {name: array.array("f", bytes(4 * width * vertex_count)) for name, width in attributes}
+
+        header = json.dumps({"attributes": attributes, "tolerance": tolerance}).encode("utf-8")
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(CACHE_MAGIC, CACHE_VERSION, vertex_count, 0, len(header)))
+        self.file.write(header)
+
+    def add_frame(self, event_id, frame):
+        """`frame` map the attribute name to its `vertex_values`, return the moved vertex count"""
+        self.file.write(struct.pack("<I", event_id))
+        moved = 0
+        for name, width in self.attributes:
+            indices, deltas = encode_delta(self.previous[name], frame[name], width, self.tolerance)
+            self.file.write(struct.pack("<I", len(indices)))
+            self.file.write(pack(indices))
+            self.file.write(pack(deltas))
+            moved = max(moved, len(indices))
+        self.frame_count += 1
+        return moved
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.file.seek(FRAME_COUNT_OFFSET)
+        self.file.write(struct.pack("<I", self.frame_count))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_point_cache(path):
+    """yield (event_id, {name: array('f')}) of every decoded frame"""
+    with open(path, "rb") as f:
+        magic, version, vertex_count, frame_count, size = HEADER.unpack(f.read(HEADER.size))
+        if magic != CACHE_MAGIC:
+            raise ValueError("not a rdpc point cache")
+        if version != CACHE_VERSION:
+            raise ValueError("unsupported rdpc version %s" % version)
+        header = json.loads(f.read(size).decode("utf-8"))
+        current = {name: array.array("f", bytes(4 * width * vertex_count)) for name, width in header["attributes"]}
+
+        for _ in range(frame_count):
+            (event_id,) = struct.unpack("<I", f.read(4))
+            for name, width in header["attributes"]:
+                (moved,) = struct.unpack("<I", f.read(4))
+                indices = array.array("I")
+                indices.frombytes(f.read(4 * moved))
+                deltas = array.array("f")
+                deltas.frombytes(f.read(4 * moved * width))
+                if sys.byteorder != "little":
+                    indices.byteswap()
+                    deltas.byteswap()
+                values = current[name]
+                for i, vertex in enumerate(indices):
+                    for k in range(width):
+                        values[vertex * width + k] = values[vertex * width + k] + deltas[i * width + k]
+            yield event_id, {name: array.array("f", values) for name, values in current.items()}
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+per stage export instrumentation
+
+record wall time, item count and optional tracemalloc peak for every stage,
+the active session is module global so the replay thread can record into it too.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import json
+import time
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+ACTIVE = []
+
+
+class Profiler(object):
+    def __init__(self, memory=False, cprofile=False):
+        self.memory = memory
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self.records = []
+        self.local = threading.local()
+        self.created = time.time()
+
+    @property
+    def stack(self):
+        """open stages of the calling thread, the pipeline worker nest its own stages"""
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    def traced_peak(self):
+        return tracemalloc.get_traced_memory()[1]
+
+    @contextmanager
+    def stage(self, name, count=None):
+        """record the block as a stage, nested stage become children in the report"""
+        record = {"name": name, "depth": len(self.stack), "count": count}
+        self.records.append(record)
+        if self.memory:
+            if self.stack:
+                parent = self.stack[-1]
+                parent["peak_bytes"] = max(parent.get("peak_bytes", 0), self.traced_peak())
+            # NOTE reset_peak is only available since python 3.9, otherwise the peak is since session start
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+        self.stack.append(record)
+
+        current = time.time()
+        try:
+            yield record
+        finally:
+            record["seconds"] = round(time.time() - current, 6)
+            self.stack.pop()
+            if self.memory:
+                record["peak_bytes"] = max(record.get("peak_bytes", 0), self.traced_peak())
+                if self.stack:
+                    parent = self.stack[-1]
+                    parent["peak_bytes"] = max(parent.get("peak_bytes", 0), record["peak_bytes"])
+
+    @contextmanager
+    def profile_thread(self):
+        """cProfile only hook the calling thread, wrap the code run in each thread"""
+        if not self.cprofile:
+            yield
+            return
+        self.cprofile.enable()
+        try:
+            yield
+        finally:
+            self.cprofile.disable()
+
+    def report(self):
+        return {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.created)),
+            "total_seconds": round(time.time() - self.created, 6),
+            "memory": self.memory,
+            "stages": self.records,
+        }
+
+    def save(self, save_path):
+        """write `<name>.profile.json` (and `<name>.prof` for cProfile) next to the output"""
+        base = os.path.splitext(save_path)[0]
+        report_path = base + ".profile.json"
+        with open(report_path, "w") as f:
+            json.dump(self.report(), f, indent=4)
+        if self.cprofile:
+            self.cprofile.dump_stats(base + ".prof")
+        return report_path
+
+    def summary(self, limit=20):
+        lines = []
+        for record in self.records[:limit]:
+            line = "%s%s: %.3fs" % ("    " * record["depth"], record["name"], record.get("seconds", 0))
+            if record["count"] is not None:
+                line += " (%s items)" % record["count"]
+            if record.get("peak_bytes"):
+                line += " peak %.1f MB" % (record["peak_bytes"] / 1024.0 / 1024.0)
+            lines.append(line)
+        if len(self.records) > limit:
+            lines.append("...")
+        return "\n".join(lines)
+
+
+class NullProfiler(Profiler):
+    """used when no session is active, record nothing"""
+
+    @contextmanager
+    def stage(self, name, count=None):
+        yield {}
+
+
+NULL = NullProfiler()
+
+
+def current():
+    return ACTIVE[-1] if ACTIVE else NULL
+
+
+def stage(name, count=None):
+    return current().stage(name, count)
+
+
+@contextmanager
+def session(enable=True, memory=False, cprofile=False):
+    """activate a profiler, yield the null profiler when not `enable`"""
+    if not enable:
+        yield NULL
+        return
+
+    memory = memory and not tracemalloc.is_tracing()
+    if memory:
+        tracemalloc.start()
+    profiler = Profiler(memory, cprofile)
+    ACTIVE.append(profiler)
+    try:
+        yield profiler
+    finally:
+        ACTIVE.remove(profiler)
+        if memory:
+            tracemalloc.stop()
+
+
+def mapper_session(mapper):
+    memory = mapper.get("PROFILE_MEMORY")
+    cprofile = mapper.get("CPROFILE")
+    # NOTE memory trace and cProfile come with the report
+    return session(mapper.get("PROFILE") or memory or cprofile, memory, cprofile)
+
+
+def call(name, func, *args):
+    """run `func` as a stage, also work as a `BlockInvoke` callback on the replay thread"""
+    profiler = current()
+    with profiler.stage(name), profiler.profile_thread():
+        return func(*args)
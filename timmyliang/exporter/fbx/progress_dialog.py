@@ -15,6 +15,8 @@ __date__ = "2021-04-17 19:50:02"
 
 from PySide2 import QtWidgets, QtCore, QtGui
 
+from . import profiler
+
 
 class MProgressDialog(QtWidgets.QProgressDialog):
     def __init__(
@@ -65,16 +67,17 @@ class MProgressDialog(QtWidgets.QProgressDialog):
         self = cls(**kwargs)
         if not kwargs.get("maximum"):
             self.setMaximum(len(seq))
-        for i, item in enumerate(seq, 1):
+        with profiler.stage(kwargs.get("status", "loop"), count=len(seq)):
+            for i, item in enumerate(seq, 1):
 
-            if self.wasCanceled():
-                break
-            try:
-                yield i, item  # with body executes here
-            except:
-                import traceback
+                if self.wasCanceled():
+                    break
+                try:
+                    yield i, item  # with body executes here
+                except:
+                    import traceback
 
-                traceback.print_exc()
-                self.deleteLater()
-            self.setValue(i)
+                    traceback.print_exc()
+                    self.deleteLater()
+                self.setValue(i)
         self.deleteLater()
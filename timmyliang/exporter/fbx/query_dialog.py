@@ -17,6 +17,12 @@ import tempfile
 from functools import partial
 from PySide2 import QtWidgets, QtCore, QtGui
 
+from .core import TEMPLATES, parse_precision
+from .generate import NORMAL_ENCODINGS
+
+# NOTE `parse_precision` input, a trailing comma is accepted
+PRECISION_PATTERN = r"\s*(\w+\s*=\s*\d+\s*(,\s*\w+\s*=\s*\d+\s*)*,?\s*)?"
+
 # manager = pyrenderdoc.Extensions()
 # mqt = manager.GetMiniQtHelper()
 
@@ -49,27 +55,7 @@ class QueryDialog(object):
 
     def template_select(self, index):
         text = self.combo.itemText(index) if hasattr(self,"combo") else "unity"
-        config = {}
-        if text == "unity":
-            config = {
-                "POSITION": "POSITION",
-                "TANGENT": "TANGENT",
-                "BINORMAL": "",
-                "NORMAL": "NORMAL",
-                "COLOR": "COLOR",
-                "UV": "TEXCOORD0",
-                "UV2": "TEXCOORD1",
-            }
-        elif text == "unreal":
-            config = {
-                "POSITION": "ATTRIBUTE0",
-                "TANGENT": "ATTRIBUTE1",
-                "BINORMAL": "",
-                "NORMAL": "ATTRIBUTE2",
-                "COLOR": "ATTRIBUTE13",
-                "UV": "ATTRIBUTE5",
-                "UV2": "ATTRIBUTE6",
-            }
+        config = TEMPLATES.get(text, {})
 
         self.settings.setValue("Engine", text)
         for name, input_widget in self.button_dict.items():
@@ -85,7 +71,7 @@ class QueryDialog(object):
         label = self.mqt.CreateLabel()
         
         self.combo = QtWidgets.QComboBox()
-        self.combo.addItems(["unity", "unreal"])
+        self.combo.addItems(list(TEMPLATES))
         self.combo.setCurrentText(self.settings.value("Engine", "unity"))
         self.combo.currentIndexChanged.connect(self.template_select)
 
@@ -94,6 +80,140 @@ class QueryDialog(object):
         self.mqt.AddWidget(container, self.combo)
         self.mqt.AddWidget(self.widget, container)
 
+        # NOTE output options, grouped on a grid instead of one long row
+        group = QtWidgets.QGroupBox("Export options")
+        grid = QtWidgets.QGridLayout(group)
+
+        self.format_combo = QtWidgets.QComboBox()
+        self.format_combo.addItems(["ascii", "binary"])
+        self.format_combo.setCurrentText(self.settings.value("Format", "ascii"))
+        self.format_combo.currentTextChanged.connect(partial(self.settings.setValue, "Format"))
+        grid.addWidget(QtWidgets.QLabel("format"), 0, 0)
+        grid.addWidget(self.format_combo, 0, 1)
+
+        self.compress_check = QtWidgets.QCheckBox("zlib compress")
+        self.compress_check.setChecked(self.settings.value("Compress", "true") == "true")
+        self.compress_check.toggled.connect(partial(self.check_change, "Compress"))
+        grid.addWidget(self.compress_check, 0, 2)
+
+        self.dedup_check = QtWidgets.QCheckBox("deduplicate layers")
+        self.dedup_check.setChecked(self.settings.value("Dedup", "false") == "true")
+        self.dedup_check.toggled.connect(partial(self.check_change, "Dedup"))
+        grid.addWidget(self.dedup_check, 0, 3)
+
+        self.precision_check = QtWidgets.QCheckBox("fixed precision")
+        self.precision_check.setChecked(self.settings.value("Precision", "false") == "true")
+        self.precision_check.toggled.connect(partial(self.check_change, "Precision"))
+        grid.addWidget(self.precision_check, 1, 0)
+
+        # NOTE digits override of the fixed precision, empty keep the defaults
+        self.precision_edit = QtWidgets.QLineEdit(self.settings.value("PrecisionDigits", ""))
+        self.precision_edit.setPlaceholderText("POSITION=7,UV=5")
+        validator = QtGui.QRegularExpressionValidator(QtCore.QRegularExpression(PRECISION_PATTERN))
+        self.precision_edit.setValidator(validator)
+        self.precision_edit.setEnabled(self.precision_check.isChecked())
+        self.precision_edit.textChanged.connect(partial(self.settings.setValue, "PrecisionDigits"))
+        self.precision_check.toggled.connect(self.precision_edit.setEnabled)
+        grid.addWidget(self.precision_edit, 1, 1, 1, 3)
+
+        # NOTE process pool encoding, 0 for serial
+        self.workers_spin = QtWidgets.QSpinBox()
+        self.workers_spin.setRange(0, 64)
+        self.workers_spin.setValue(int(self.settings.value("Workers", 0)))
+        self.workers_spin.valueChanged.connect(partial(self.settings.setValue, "Workers"))
+        grid.addWidget(QtWidgets.QLabel("workers"), 2, 0)
+        grid.addWidget(self.workers_spin, 2, 1)
+
+        # NOTE process pool of the batch export, the draws are exported in parallel
+        self.batch_spin = QtWidgets.QSpinBox()
+        self.batch_spin.setRange(0, 64)
+        self.batch_spin.setValue(int(self.settings.value("BatchWorkers", os.cpu_count() or 1)))
+        self.batch_spin.valueChanged.connect(partial(self.settings.setValue, "BatchWorkers"))
+        grid.addWidget(QtWidgets.QLabel("batch workers"), 2, 2)
+        grid.addWidget(self.batch_spin, 2, 3)
+
+        # NOTE run the export in a system python process fed through shared memory
+        self.helper_check = QtWidgets.QCheckBox("helper process")
+        self.helper_check.setChecked(self.settings.value("Helper", "false") == "true")
+        self.helper_check.toggled.connect(partial(self.check_change, "Helper"))
+        grid.addWidget(self.helper_check, 3, 0)
+
+        # NOTE export without blocking RenderDoc, cancel keep the previous file
+        self.background_check = QtWidgets.QCheckBox("background")
+        self.background_check.setChecked(self.settings.value("Background", "false") == "true")
+        self.background_check.toggled.connect(partial(self.check_change, "Background"))
+        grid.addWidget(self.background_check, 3, 1)
+
+        # NOTE rewrite even when the target already hold the same content hash
+        self.force_check = QtWidgets.QCheckBox("force rewrite")
+        self.force_check.setChecked(self.settings.value("Force", "false") == "true")
+        self.force_check.toggled.connect(partial(self.check_change, "Force"))
+        grid.addWidget(self.force_check, 3, 2)
+        self.mqt.AddWidget(self.widget, group)
+
+        # NOTE decoded mesh cache, the memory budget in MB
+        container = self.mqt.CreateHorizontalContainer()
+        label = self.mqt.CreateLabel()
+        self.mqt.SetWidgetText(label, "cache")
+        self.mqt.AddWidget(container, label)
+
+        self.cache_spin = QtWidgets.QSpinBox()
+        self.cache_spin.setRange(0, 65536)
+        self.cache_spin.setSuffix(" MB")
+        self.cache_spin.setValue(int(self.settings.value("CacheBudget", 512)))
+        self.cache_spin.valueChanged.connect(partial(self.settings.setValue, "CacheBudget"))
+        self.mqt.AddWidget(container, self.cache_spin)
+
+        self.cache_disk_check = QtWidgets.QCheckBox("disk cache")
+        self.cache_disk_check.setChecked(self.settings.value("CacheDisk", "false") == "true")
+        self.cache_disk_check.toggled.connect(partial(self.check_change, "CacheDisk"))
+        self.mqt.AddWidget(container, self.cache_disk_check)
+
+        # NOTE export working set over the budget spill to memory mapped files, 0 for no limit
+        self.memory_spin = QtWidgets.QSpinBox()
+        self.memory_spin.setRange(0, 1048576)
+        self.memory_spin.setPrefix("memory budget ")
+        self.memory_spin.setSuffix(" MB")
+        self.memory_spin.setValue(int(self.settings.value("MemoryBudget", 0)))
+        self.memory_spin.valueChanged.connect(partial(self.settings.setValue, "MemoryBudget"))
+        self.mqt.AddWidget(container, self.memory_spin)
+        self.mqt.AddWidget(self.widget, container)
+
+        # NOTE decode the packed NORMAL input, generate the normals and tangents the capture lack
+        container = self.mqt.CreateHorizontalContainer()
+        label = self.mqt.CreateLabel()
+        self.mqt.SetWidgetText(label, "generate")
+        self.mqt.AddWidget(container, label)
+
+        self.encoding_combo = QtWidgets.QComboBox()
+        self.encoding_combo.addItems([""] + list(NORMAL_ENCODINGS))
+        self.encoding_combo.setCurrentText(self.settings.value("NormalEncoding", ""))
+        self.encoding_combo.currentTextChanged.connect(partial(self.settings.setValue, "NormalEncoding"))
+        self.mqt.AddWidget(container, self.encoding_combo)
+
+        self.generate_checks = {}
+        for key, text in (("GenerateNormals", "normals"), ("GenerateTangents", "tangents (approximate MikkTSpace)")):
+            check = QtWidgets.QCheckBox(text)
+            check.setChecked(self.settings.value(key, "false") == "true")
+            check.toggled.connect(partial(self.check_change, key))
+            self.generate_checks[key] = check
+            self.mqt.AddWidget(container, check)
+        self.mqt.AddWidget(self.widget, container)
+
+        # NOTE profiling option, write a json report next to the fbx
+        container = self.mqt.CreateHorizontalContainer()
+        label = self.mqt.CreateLabel()
+        self.mqt.SetWidgetText(label, "profile")
+        self.mqt.AddWidget(container, label)
+        self.profile_checks = {}
+        for key, text in (("Profile", "report"), ("ProfileMemory", "trace memory"), ("CProfile", "cProfile")):
+            check = QtWidgets.QCheckBox(text)
+            check.setChecked(self.settings.value(key, "false") == "true")
+            check.toggled.connect(partial(self.check_change, key))
+            self.profile_checks[key] = check
+            self.mqt.AddWidget(container, check)
+        self.mqt.AddWidget(self.widget, container)
+
         self.button_dict = {}
         for name, label in self.edit_config.items():
             w = self.input_widget(label, name)
@@ -123,9 +243,36 @@ class QueryDialog(object):
             self.mapper[name] = text
         
         self.mapper['ENGINE'] = self.combo.currentText()
+        self.mapper['FORMAT'] = self.format_combo.currentText()
+        self.mapper['COMPRESS'] = self.compress_check.isChecked()
+        self.mapper['DEDUP'] = self.dedup_check.isChecked()
+        self.mapper['WORKERS'] = self.workers_spin.value()
+        self.mapper['BATCH_WORKERS'] = self.batch_spin.value()
+        self.mapper['HELPER'] = self.helper_check.isChecked()
+        self.mapper['BACKGROUND'] = self.background_check.isChecked()
+        self.mapper['FORCE'] = self.force_check.isChecked()
+        # NOTE digits override like `POSITION=7,UV=5`
+        if self.precision_check.isChecked():
+            # NOTE an unfinished override like `UV=` keep the default digits
+            digits = self.precision_edit.text() if self.precision_edit.hasAcceptableInput() else ""
+            self.mapper['PRECISION'] = parse_precision(digits)
+        # NOTE system python for the workers, auto detect when empty
+        self.mapper['PYTHON'] = self.settings.value("Python", "")
+        self.mapper['NORMAL_ENCODING'] = self.encoding_combo.currentText()
+        self.mapper['GENERATE_NORMALS'] = self.generate_checks["GenerateNormals"].isChecked()
+        self.mapper['GENERATE_TANGENTS'] = self.generate_checks["GenerateTangents"].isChecked()
+        self.mapper['CACHE_BUDGET'] = self.cache_spin.value()
+        self.mapper['CACHE_DISK'] = self.cache_disk_check.isChecked()
+        self.mapper['MEMORY_BUDGET'] = self.memory_spin.value()
+        self.mapper['PROFILE'] = self.profile_checks["Profile"].isChecked()
+        self.mapper['PROFILE_MEMORY'] = self.profile_checks["ProfileMemory"].isChecked()
+        self.mapper['CPROFILE'] = self.profile_checks["CProfile"].isChecked()
 
         self.mqt.CloseCurrentDialog(True)
 
+    def check_change(self, key, checked):
+        self.settings.setValue(key, "true" if checked else "false")
+
     def textChange(self, key, c, w, text):
         self.settings.setValue(key, text)
 
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+compact the index buffer into dense vertex ids
+
+the used indices keep their sorted order, gaps in the index range are closed,
+one table is shared by every per vertex layer.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import array
+
+# NOTE larger index range than this times the corner count fall back to sort the used indices
+MAX_SPAN_RATIO = 4
+
+
+def dense_remap(indices):
+    """return the compacted index per corner and the first corner of every new vertex
+
+    :param indices: index buffer, any sequence of int
+    """
+    if not len(indices):
+        return [], []
+    low = min(indices)
+    span = max(indices) - low + 1
+
+    if span > MAX_SPAN_RATIO * len(indices):
+        # NOTE sparse index, only sort the used ones
+        first = {}
+        for corner, idx in enumerate(indices):
+            if idx not in first:
+                first[idx] = corner
+        used = sorted(first)
+        table = {idx: new for new, idx in enumerate(used)}
+        return [table[idx] for idx in indices], [first[idx] for idx in used]
+
+    # NOTE one slot per index in range, -1 for unused
+    first = array.array("q", [-1]) * span
+    for corner, idx in enumerate(indices):
+        if first[idx - low] < 0:
+            first[idx - low] = corner
+    table = array.array("q", [-1]) * span
+    vertex_order = []
+    for slot, corner in enumerate(first):
+        if corner >= 0:
+            table[slot] = len(vertex_order)
+            vertex_order.append(corner)
+    return [table[idx - low] for idx in indices], vertex_order
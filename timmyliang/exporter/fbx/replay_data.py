@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+read the vertex inputs from the replay controller directly
+
+must run inside the `BlockInvoke` callback,
+the output match the `data`/`attr_list` structure scraped from the `vsinData` table.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import sys
+import array
+import struct
+from collections import defaultdict
+
+import renderdoc as rd
+
+from .mesh_data import Mesh
+from .topology import TRIANGLE_TOPOLOGIES, RESTART_INDICES, UnsupportedMesh, triangle_corners, take
+
+# NOTE index by component byte width
+FORMAT_CHARS = {
+    rd.CompType.UInt: "xBHxIxxxQ",
+    rd.CompType.SInt: "xbhxixxxq",
+    rd.CompType.Float: "xxexfxxxd",
+}
+FORMAT_CHARS[rd.CompType.UNorm] = FORMAT_CHARS[rd.CompType.UInt]
+FORMAT_CHARS[rd.CompType.UScaled] = FORMAT_CHARS[rd.CompType.UInt]
+FORMAT_CHARS[rd.CompType.SNorm] = FORMAT_CHARS[rd.CompType.SInt]
+FORMAT_CHARS[rd.CompType.SScaled] = FORMAT_CHARS[rd.CompType.SInt]
+
+INDEX_CHARS = {1: "B", 2: "H", 4: "I"}
+# NOTE `renderdoc.Topology` to the names of `topology`
+TOPOLOGIES = {getattr(rd.Topology, name): name for name in TRIANGLE_TOPOLOGIES}
+
+
+class UnsupportedFormat(UnsupportedMesh):
+    """the vertex inputs can not be decoded from the buffers, the Mesh Viewer table can still be read"""
+
+
+def vertex_char(fmt):
+    """struct character of one component"""
+    if fmt.Special():
+        raise UnsupportedFormat("special vertex format %s" % fmt.Name())
+    char = FORMAT_CHARS.get(fmt.compType, "x" * 9)[fmt.compByteWidth]
+    if char == "x":
+        raise UnsupportedFormat("unsupported vertex format %s" % fmt.Name())
+    return char
+
+
+def pack_vertices(buffer, size, stride, count):
+    """the first `size` bytes of each stride packed back to back
+
+    copy one byte column at a time with extended slices, there is no python loop over the vertices.
+    """
+    if stride == size:
+        packed = bytes(memoryview(buffer)[: size * count])
+    else:
+        source = bytes(memoryview(buffer)[: stride * count])
+        # NOTE the last vertex may not cover the whole stride
+        required = stride * (count - 1) + size
+        if len(source) < required:
+            source += b"\x00" * (required - len(source))
+        packed = bytearray(size * count)
+        for offset in range(size):
+            packed[offset::size] = source[offset::stride][:count]
+    if len(packed) < size * count:
+        packed = bytes(packed) + b"\x00" * (size * count - len(packed))
+    return packed
+
+
+def normalize(fmt, values):
+    """scale the UNORM/SNORM values and reorder the BGRA components of the flat `values`"""
+    if fmt.compType == rd.CompType.UNorm:
+        divisor = float(2 ** (fmt.compByteWidth * 8) - 1)
+        values = [v / divisor for v in values]
+    elif fmt.compType == rd.CompType.SNorm:
+        divisor = float(2 ** (fmt.compByteWidth * 8 - 1) - 1)
+        values = [max(v / divisor, -1.0) for v in values]
+
+    if fmt.BGRAOrder():
+        values = list(values)
+        swapped = values[2::4], values[0::4]
+        values[0::4], values[2::4] = swapped
+    return values
+
+
+def unpack_vertices(buffer, fmt, stride, count):
+    """bulk decode `count` vertices from the buffer start into a flat `array`
+
+    float inputs up to 32 bits are kept as `f` without loss, the normalized and integer ones as `d`.
+    the whole range is unpacked by a single struct call, only UNORM/SNORM and BGRA go through `normalize`.
+    """
+    type_code = "f" if fmt.compType == rd.CompType.Float and fmt.compByteWidth <= 4 else "d"
+    char = vertex_char(fmt)
+    size = struct.calcsize("<%d%s" % (fmt.compCount, char))
+    if not stride:
+        values = struct.unpack_from("<%d%s" % (fmt.compCount, char), buffer, 0)
+        return array.array(type_code, normalize(fmt, values)) * count
+
+    packed = pack_vertices(buffer, size, stride, count)
+    if type_code == "f" and char == "f" and sys.byteorder == "little" and not fmt.BGRAOrder():
+        # NOTE the packed bytes are already the `array` layout
+        values = array.array(type_code)
+        values.frombytes(packed)
+        return values
+    values = struct.unpack("<%d%s" % (fmt.compCount * count, char), packed)
+    return array.array(type_code, normalize(fmt, values))
+
+
+def primitive_topology(state):
+    """(topology name, restart index or None) of the pipeline state, also work on the UI `CurPipelineState`"""
+    topology = state.GetPrimitiveTopology()
+    if topology not in TOPOLOGIES:
+        raise UnsupportedMesh("the draw use the %s topology, only triangle topologies can be exported" % topology)
+    restart = None
+    if state.IsRestartEnabled():
+        # NOTE the restart index only keep the bits of the index width, e.g. 0xFFFF for 16 bits
+        restart = state.GetRestartIndex() & RESTART_INDICES.get(state.GetIBuffer().byteStride, 0xFFFFFFFF)
+    return TOPOLOGIES[topology], restart
+
+
+def fetch_indices(controller, action, ibuffer, topology="TriangleList", restart=None):
+    """index buffer converted to a triangle list as an `array`, no python int list"""
+    if not action.flags & rd.ActionFlags.Indexed:
+        indices = array.array("I", range(action.numIndices))
+        # NOTE the restart only apply to the index buffer
+        restart = None
+    else:
+        stride = ibuffer.byteStride
+        char = INDEX_CHARS[stride]
+        offset = ibuffer.byteOffset + action.indexOffset * stride
+        buffer = controller.GetBufferData(ibuffer.resourceId, offset, action.numIndices * stride)
+        indices = array.array(char)
+        indices.frombytes(bytes(buffer[: action.numIndices * stride]))
+        if sys.byteorder != "little":
+            indices.byteswap()
+
+    # NOTE the restart index is compared before the base vertex is added
+    source = triangle_corners(indices, topology, restart)
+    if source is not None:
+        indices = take(indices, source)
+    if not action.flags & rd.ActionFlags.Indexed or not action.baseVertex:
+        return indices
+    return array.array("q", (idx + action.baseVertex for idx in indices))
+
+
+def fetch_mesh_data(controller, action):
+    data = defaultdict(list)
+    attr_list = set()
+    if not action or not action.numIndices:
+        return data, attr_list
+
+    state = controller.GetPipelineState()
+    vbuffers = state.GetVBuffers()
+    indices = fetch_indices(controller, action, state.GetIBuffer(), *primitive_topology(state))
+    if not len(indices):
+        # NOTE every triangle is degenerate
+        return data, attr_list
+    first = min(indices)
+    count = max(indices) - first + 1
+
+    # NOTE one row per vertex in the used range, the corners point into it
+    mesh = Mesh(indices, (idx - first for idx in indices))
+
+    buffers = {}
+    for attr in state.GetVertexInputs():
+        fmt = attr.format
+        if attr.genericEnabled:
+            values = list(attr.genericValue.floatValue)[: fmt.compCount]
+            mesh.add(attr.name, array.array("f", values) * count, len(values))
+            attr_list.add(attr.name)
+            continue
+        if attr.perInstance:
+            raise UnsupportedFormat("per instance attribute %s" % attr.name)
+
+        vbuffer = vbuffers[attr.vertexBuffer]
+        stride = vbuffer.byteStride
+        # NOTE fetch the used range of each vertex buffer only once
+        if attr.vertexBuffer not in buffers:
+            offset = vbuffer.byteOffset + (action.vertexOffset + first) * stride
+            # NOTE zero length read the whole buffer for the zero stride case
+            length = count * stride
+            buffers[attr.vertexBuffer] = controller.GetBufferData(vbuffer.resourceId, offset, length)
+
+        buffer = memoryview(buffers[attr.vertexBuffer])[attr.byteOffset :]
+        mesh.add(attr.name, unpack_vertices(buffer, fmt, stride, count), fmt.compCount)
+        attr_list.add(attr.name)
+
+    return mesh, attr_list
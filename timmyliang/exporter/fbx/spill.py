@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+memory mapped spill buffers
+
+when the estimated working set exceed the `MEMORY_BUDGET` (MB) of the mapper,
+the attribute columns and the built layers move to memory mapped temporary files,
+the OS page them in and out instead of swapping the python heap.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import mmap
+import array
+import tempfile
+from itertools import chain
+from collections import defaultdict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .mesh_cache import estimate_bytes
+
+# NOTE rows converted per slice, bound the temporary python objects
+CHUNK_ROWS = 65536
+
+
+def map_file(size):
+    """anonymous temporary file mapped in memory, removed once closed"""
+    f = tempfile.TemporaryFile()
+    # NOTE zero length can not be mapped
+    size = max(size, mmap.ALLOCATIONGRANULARITY)
+    f.truncate(size)
+    return f, mmap.mmap(f.fileno(), size)
+
+
+class SpillColumn(object):
+    """per row float values of one attribute kept in a memory mapped file
+
+    behave like the list of per row lists scraped from the table,
+    `as_array` return a zero copy numpy view for the vectorized engine.
+    """
+
+    def __init__(self, count, width):
+        self.count = count
+        self.width = width
+        self.nbytes = count * width * 8
+        self.file, self.mmap = map_file(self.nbytes)
+        self.values = memoryview(self.mmap).cast("d")[: count * width]
+
+    @classmethod
+    def from_rows(cls, rows):
+        width = len(rows[0]) if len(rows) else 0
+        column = cls(len(rows), width)
+        for start in range(0, len(rows), CHUNK_ROWS):
+            chunk = array.array("d", chain.from_iterable(rows[start : start + CHUNK_ROWS]))
+            column.values[start * width : start * width + len(chunk)] = chunk
+        return column
+
+    @classmethod
+    def from_columns(cls, columns, count):
+        """parse the component columns (number or display string) straight into the file"""
+        width = len(columns)
+        column = cls(count, width)
+        for start in range(0, count, CHUNK_ROWS):
+            end = min(start + CHUNK_ROWS, count)
+            parsed = [map(float, values[start:end]) for values in columns]
+            column.values[start * width : end * width] = array.array("d", chain.from_iterable(zip(*parsed)))
+        return column
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("spill column index out of range")
+        return self.values[index * self.width : (index + 1) * self.width].tolist()
+
+    def __iter__(self):
+        width = self.width
+        for start in range(0, self.count, CHUNK_ROWS):
+            flat = self.values[start * width : min(start + CHUNK_ROWS, self.count) * width].tolist()
+            for i in range(0, len(flat), width):
+                yield flat[i : i + width]
+
+    def as_array(self):
+        return np.frombuffer(self.mmap, dtype=np.float64, count=self.count * self.width).reshape(
+            self.count, self.width
+        )
+
+
+def spill_values(values, code="d"):
+    """move a flat layer array into a memory mapped file, return a view the writers accept"""
+    if np is not None and hasattr(values, "dtype"):
+        f, buffer = map_file(values.nbytes)
+        spilled = np.frombuffer(buffer, dtype=values.dtype, count=values.size).reshape(values.shape)
+        spilled[...] = values
+        return spilled
+
+    f, buffer = map_file(len(values) * 8)
+    view = memoryview(buffer).cast(code)[: len(values)]
+    for start in range(0, len(values), CHUNK_ROWS):
+        chunk = array.array(code, values[start : start + CHUNK_ROWS])
+        view[start : start + len(chunk)] = chunk
+    return view
+
+
+def spill_layer(key, values):
+    """`spill_values` with the integer type for the polygon and index layers"""
+    integer = key in ("polygons", "binormalsW") or key.endswith("_indices")
+    return spill_values(values, "q" if integer else "d")
+
+
+def rows_bytes(row_count, widths):
+    """estimated size of the per row float lists, list and float objects included"""
+    return sum(row_count * (64 + 32 * width) for width in widths)
+
+
+def over_budget(size, mapper):
+    budget = mapper.get("MEMORY_BUDGET")
+    return bool(budget) and size > budget * 1024 * 1024
+
+
+def working_set(data, attr_list):
+    """the input plus about two float64 copies of every attribute while building the layers"""
+    rows = len(data.get("IDX", ()))
+    size = estimate_bytes(data, attr_list)
+    for attr in attr_list:
+        if len(data[attr]):
+            size += rows * len(data[attr][0]) * 8 * 2
+    return size
+
+
+def is_spilled(data, attr_list):
+    return any(isinstance(data[attr], SpillColumn) for attr in attr_list)
+
+
+def bound_memory(data, attr_list, mapper):
+    """return `data`, or a copy with the attribute columns spilled when the working set exceed the budget
+
+    `data` itself is not modified, it may be held by the mesh cache.
+    """
+    if is_spilled(data, attr_list) or not over_budget(working_set(data, attr_list), mapper):
+        return data
+    spilled = defaultdict(list, data.items())
+    for attr in attr_list:
+        if len(data[attr]):
+            spilled[attr] = SpillColumn.from_rows(data[attr])
+    return spilled
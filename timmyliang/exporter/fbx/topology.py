@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+primitive topology to triangle list
+
+the FBX polygons and the glTF primitive are triangle lists,
+strips, fans, the adjacency topologies and the primitive restart index are resolved here
+into the source corner of every triangle list corner, the degenerate triangles are dropped.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from . import spill
+from .mesh_data import Mesh
+
+# NOTE the names of `renderdoc.Topology` the export can triangulate
+TRIANGLE_TOPOLOGIES = ("TriangleList", "TriangleStrip", "TriangleFan", "TriangleList_Adj", "TriangleStrip_Adj")
+# NOTE restart index by index byte width
+RESTART_INDICES = {1: 0xFF, 2: 0xFFFF, 4: 0xFFFFFFFF}
+
+
+class UnsupportedMesh(ValueError):
+    """the draw can not be exported as a triangle mesh, e.g. points or lines, the message is shown to the user"""
+
+
+def check_topology(topology):
+    if topology not in TRIANGLE_TOPOLOGIES:
+        raise UnsupportedMesh("the draw use the %s topology, only triangle topologies can be exported" % topology)
+
+
+def numpy_triangles(idx, topology, restart):
+    """(triangle, 3) source corners, every segment between restart indices start a new primitive"""
+    n = len(idx)
+    # NOTE half the memory traffic of int64 for the usual index counts
+    positions = np.arange(n, dtype=np.int32 if n < 2 ** 31 else np.int64)
+    is_restart = idx == restart if restart is not None else None
+    if is_restart is not None and is_restart.any():
+        # NOTE first position of the segment holding every position, and the position ending it
+        start = np.maximum.accumulate(np.where(is_restart, positions + 1, 0).astype(positions.dtype))
+        end = np.minimum.accumulate(np.where(is_restart, positions, n)[::-1])[::-1]
+        local = positions - start
+        valid = ~is_restart
+    else:
+        start, end, local, valid = 0, n, positions, True
+
+    if topology == "TriangleList":
+        p = positions[valid & (local % 3 == 0) & (positions + 2 < end)]
+        return triangle_array(p, p + 1, p + 2)
+    if topology == "TriangleList_Adj":
+        # NOTE the odd corners are the adjacent vertices
+        p = positions[valid & (local % 6 == 0) & (positions + 5 < end)]
+        return triangle_array(p, p + 2, p + 4)
+    if topology == "TriangleFan":
+        p = positions[valid & (local >= 2)]
+        return triangle_array(start[p] if isinstance(start, np.ndarray) else start, p - 1, p)
+
+    # NOTE strip, `p` is the last corner of every triangle, `step` the distance between its corners
+    step = 2 if topology == "TriangleStrip_Adj" else 1
+    p = positions[valid & (local >= 2 * step) & (local % step == 0)]
+    # NOTE every other strip triangle swap its first corners to keep the winding
+    odd = ((local[p] if isinstance(local, np.ndarray) else p) // step % 2).astype(p.dtype) * step
+    return triangle_array(p - 2 * step + odd, p - step - odd, p)
+
+
+def triangle_array(a, b, c):
+    triangles = np.empty((len(c), 3), dtype=c.dtype)
+    triangles[:, 0] = a
+    triangles[:, 1] = b
+    triangles[:, 2] = c
+    return triangles
+
+
+def segment_triangles(start, end, topology):
+    if topology == "TriangleList":
+        return [(p, p + 1, p + 2) for p in range(start, end - 2, 3)]
+    if topology == "TriangleList_Adj":
+        return [(p, p + 2, p + 4) for p in range(start, end - 5, 6)]
+    if topology == "TriangleFan":
+        return [(start, p - 1, p) for p in range(start + 2, end)]
+    main = range(start, end, 2 if topology == "TriangleStrip_Adj" else 1)
+    triangles = []
+    for j in range(len(main) - 2):
+        a, b, c = main[j], main[j + 1], main[j + 2]
+        triangles.append((b, a, c) if j % 2 else (a, b, c))
+    return triangles
+
+
+def python_triangles(indices, topology, restart):
+    triangles = []
+    start = 0
+    ends = [i for i, idx in enumerate(indices) if idx == restart] if restart is not None else []
+    for end in ends + [len(indices)]:
+        triangles.extend(segment_triangles(start, end, topology))
+        start = end + 1
+    return triangles
+
+
+def degenerate(triangles):
+    """zero area by index, the same vertex used twice"""
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    return (a == b) | (b == c) | (a == c)
+
+
+def triangle_corners(indices, topology="TriangleList", restart=None):
+    """source corner of every triangle list corner, None when `indices` already is a clean triangle list
+
+    :param topology: one of `TRIANGLE_TOPOLOGIES`
+    :param restart: primitive restart index, None when the restart is disabled
+    """
+    check_topology(topology)
+    if np is not None:
+        idx = np.asarray(indices)
+        if idx.dtype.kind not in "iu":
+            idx = idx.astype(np.int64)
+        if topology == "TriangleList" and len(idx) % 3 == 0 and (restart is None or not (idx == restart).any()):
+            if not degenerate(idx.reshape(-1, 3)).any():
+                return None
+        triangles = numpy_triangles(idx, topology, restart)
+        keep = ~degenerate(idx[triangles])
+        if not keep.all():
+            triangles = triangles[keep]
+        return triangles.ravel()
+
+    triangles = python_triangles(indices, topology, restart)
+    source = array.array("q")
+    for triangle in triangles:
+        a, b, c = (indices[corner] for corner in triangle)
+        if a != b and b != c and a != c:
+            source.extend(triangle)
+    if topology == "TriangleList" and len(source) == len(indices):
+        return None
+    return source
+
+
+def take(values, source):
+    """rows of a per corner column at the `source` corners, in the same kind of container"""
+    if hasattr(values, "dtype"):
+        return values[np.asarray(source)]
+    if hasattr(values, "as_array"):
+        # NOTE spilled column, the picked rows go to a new mapped file
+        rows = values.as_array()[np.asarray(source)] if np is not None else take(list(values), source)
+        return spill.SpillColumn.from_rows(rows)
+    if isinstance(values, array.array) and np is not None:
+        return array.array(values.typecode, np.frombuffer(values, dtype=values.typecode)[np.asarray(source)].tobytes())
+    source = source.tolist()
+    if isinstance(values, array.array):
+        return array.array(values.typecode, [values[i] for i in source])
+    return [values[i] for i in source]
+
+
+def triangulate(data, attr_list, topology="TriangleList", restart=None):
+    """`data` with every per corner column turned into the triangle list, return the converted data"""
+    source = triangle_corners(data["IDX"], topology, restart)
+    if source is None:
+        return data
+    if isinstance(data, Mesh):
+        # NOTE compact `Mesh`, only the corner tables change, the vertex values are shared
+        mesh = Mesh(take(data.indices, source), take(data.corners, source))
+        for name, column in data.columns.items():
+            mesh.add(name, column.values, column.width)
+        return mesh
+    for key in list(data):
+        if len(data[key]):
+            data[key] = take(data[key], source)
+    return data
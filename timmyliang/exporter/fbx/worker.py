@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+entry of the worker processes, `python -m exporter.fbx.worker pool|helper`
+
+stdin carry the pickled tasks, stdout the pickled results, the prints go to stderr.
+"""
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import sys
+import pickle
+import traceback
+
+from .parallel import PROTOCOL
+
+
+def serve(stdin, send):
+    """run every `(func, args)` task until stdin is closed"""
+    while True:
+        try:
+            func, args = pickle.load(stdin)
+        except EOFError:
+            return
+        except Exception as error:
+            # NOTE the stream can not be read any further
+            send(("error", error, traceback.format_exc()))
+            return
+        try:
+            send(("result", func(*args)))
+        except Exception as error:
+            send(("error", error, traceback.format_exc()))
+
+
+def main(mode):
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    # NOTE a print would corrupt the messages
+    sys.stdout = sys.stderr
+
+    def send(message):
+        try:
+            data = pickle.dumps(message, PROTOCOL)
+        except Exception:
+            data = pickle.dumps(("error", RuntimeError("unpicklable message"), traceback.format_exc()), PROTOCOL)
+        stdout.write(data)
+        stdout.flush()
+
+    if mode == "helper":
+        from .helper import helper_main
+
+        helper_main(pickle.load(stdin), send)
+    else:
+        serve(stdin, send)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1])